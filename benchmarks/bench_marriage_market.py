@@ -0,0 +1,70 @@
+# benchmarks/bench_marriage_market.py
+# Marriages per second for the MarriageManager matching step, indexed market vs. the old
+# full-population scan, as the population grows. Run from the repo root:
+#     python benchmarks/bench_marriage_market.py [--sizes 70000 250000 1000000] [--legacy-sample 200]
+import argparse, os, random, sys, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mastercode02_generator import DATA, assign_marital_status
+from mastercode02_marriage_market import MarriageMarket
+
+class Agent:
+    __slots__ = ('id', 'age', 'sex', 'marital_status')
+    def __init__(self, id, age, sex, marital_status):
+        self.id, self.age, self.sex, self.marital_status = id, age, sex, marital_status
+
+def synthetic_population(size):
+    groups = [(sex, label, count) for sex, ages in DATA['demographics'].items() for label, count in ages.items()]
+    base = sum(count for _, _, count in groups); people = []
+    for sex, label, count in groups:
+        nums = [int(s) for s in label.replace('years', '').split() if s.isdigit()]
+        lo, hi = (0, 4) if 'Under' in label else (85, 95) if 'over' in label else (nums[0], nums[1])
+        for _ in range(round(count * size / base)):
+            age = random.randint(lo, hi)
+            people.append(Agent(len(people) + 1, age, sex, assign_marital_status(age, sex)))
+    return people
+
+def eligible_males(population):
+    males = [p for p in population if p.sex == 'Male' and p.age >= 22 and p.marital_status == 'Never married']
+    random.shuffle(males); return males
+
+def run_indexed(population, now=0):
+    market = MarriageMarket()
+    for p in population:
+        if p.sex == 'Female' and p.marital_status == 'Never married': market.add(p, now)
+    marriages = 0; start = time.perf_counter()
+    for male in eligible_males(population):
+        if random.random() < 0.40:
+            female = market.draw(male.age, now)
+            if female is not None:
+                male.marital_status = 'Married'; female.marital_status = 'Married'; market.discard(female); marriages += 1
+    return marriages, time.perf_counter() - start
+
+def run_legacy(population, sample):
+    marriages = 0; start = time.perf_counter()
+    for male in eligible_males(population)[:sample]:
+        if random.random() < 0.40:
+            eligible_females = [p for p in population if p.sex == 'Female' and p.marital_status == 'Never married' and abs(p.age - male.age) <= 5]
+            if eligible_females:
+                female = random.choice(eligible_females)
+                male.marital_status = 'Married'; female.marital_status = 'Married'; marriages += 1
+    return marriages, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Marriage matching throughput vs. population size')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[70_000, 250_000, 500_000, 1_000_000])
+    parser.add_argument('--legacy-sample', type=int, default=200, help='eligible males timed with the legacy scan (0 to skip)')
+    parser.add_argument('--seed', type=int, default=123)
+    args = parser.parse_args()
+    print(f"{'population':>12} {'marriages':>10} {'indexed/s':>12} {'legacy/s':>12}")
+    for size in args.sizes:
+        random.seed(args.seed); population = synthetic_population(size)
+        marriages, elapsed = run_indexed(population)
+        legacy_rate = float('nan')
+        if args.legacy_sample:
+            random.seed(args.seed); population = synthetic_population(size)
+            legacy_marriages, legacy_elapsed = run_legacy(population, args.legacy_sample)
+            legacy_rate = legacy_marriages / legacy_elapsed if legacy_elapsed > 0 else float('nan')
+        print(f"{len(population):>12,} {marriages:>10,} {marriages / elapsed if elapsed > 0 else float('nan'):>12,.0f} {legacy_rate:>12,.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# benchmarks/bench_simulation.py
+# Phase and per-manager timings of the full simulation as the population grows, written as JSON so runs can be
+# compared across commits and fitted to scaling curves. Offline; run from the repo root:
+#     python benchmarks/bench_simulation.py [--sizes 10000 73440 250000 1000000] [--years 3] [--engine agents]
+#                                           [--output bench_simulation.json] [--cold-cache]
+# Phases: arima_setup (EconomicManager + WorldManager forecasts), init (population, households, jobs),
+# run (every component's yearly steps, from mastercode02_profile.Profiler; YearlyReporter is the logging)
+# and csv (write_and_close_csv_logs).
+import argparse, datetime, json, os, platform, resource, subprocess, sys, tempfile, time
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def git_commit():
+    try: return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except OSError: return None
+
+def run_size(size, years, engine, seed, out_dir):
+    import contextlib, io
+    import salabim as sim
+    from copy import deepcopy
+    import mastercode02_globals as g
+    from mastercode02_config_and_rates import RATES
+    from mastercode02_generator import DATA
+    from mastercode02_agents import ScenarioManager, EconomicManager, WorldManager
+    from mastercode02_setup import Initializer, CohortInitializer
+    from mastercode02_runner import start_managers
+    from mastercode02_logging import reset_log_data, write_and_close_csv_logs
+    from mastercode02_profile import Profiler
+
+    multiplier = size / sum(count for ages in DATA['demographics'].values() for count in ages.values())
+    phases = {}; perf = time.perf_counter
+    with contextlib.redirect_stdout(io.StringIO()):
+        g.reset(); reset_log_data()
+        env = sim.Environment(time_unit='years', random_seed=seed, trace=False)
+        g.RATES = deepcopy(RATES); env.RATES = g.RATES
+        initializer = CohortInitializer(env=env, seed=seed, multiplier=multiplier, log=True) if engine == 'cohort' else Initializer(env=env, seed=seed, multiplier=multiplier)
+        ScenarioManager(env=env, events=[])
+        start = perf(); EconomicManager(env=env); WorldManager(env=env); phases['arima_setup_s'] = perf() - start
+        start = perf(); env.run(till=0); phases['init_s'] = perf() - start
+        agents = len(g.POPULATION) if engine != 'cohort' else int(initializer.engine.aggregates()['population'])
+        if engine != 'cohort': start_managers(env, final_year=years)
+        profiler = Profiler()
+        start = perf(); profiler.run(env, years); phases['run_s'] = perf() - start
+        start = perf(); write_and_close_csv_logs(os.path.join(out_dir, f"bench_{size}"), env); phases['csv_s'] = perf() - start
+    table = profiler.table(); components = {}
+    for name, rows in table.groupby('component'):
+        rows = rows.sort_values('year')
+        components[name] = {'wall_s': float(rows['wall_s'].sum()), 'events': int(rows['events'].sum()), 'agents': int(rows['agents'].sum()),
+                            'per_year_s': {int(y): float(w) for y, w in zip(rows['year'], rows['wall_s'])}}
+    return {'size': size, 'agents': agents, 'multiplier': multiplier, 'years': years, 'engine': engine, 'seed': seed,
+            'phases': phases, 'components': components,
+            'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+def main():
+    parser = argparse.ArgumentParser(description='Full-simulation scaling benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 73_440, 250_000, 1_000_000], help='target number of agents')
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--engine', choices=['agents', 'cohort'], default='agents')
+    parser.add_argument('--seed', type=int, default=123)
+    parser.add_argument('--output', default='bench_simulation.json')
+    parser.add_argument('--cold-cache', action='store_true', help='use an empty population/ARIMA cache, so arima_setup includes the model fits')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.cold_cache: os.environ['MASTERCODE02_CACHE_DIR'] = os.path.join(tmp, 'cache')
+        import numpy, pandas, salabim
+        result = {'commit': git_commit(), 'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+                  'python': platform.python_version(), 'platform': platform.platform(), 'cold_cache': args.cold_cache,
+                  'versions': {'numpy': numpy.__version__, 'pandas': pandas.__version__, 'salabim': salabim.__version__}, 'runs': []}
+        print(f"{'agents':>10} {'arima':>8} {'init':>8} {'run':>8} {'csv':>8}  slowest components")
+        for size in args.sizes:
+            # Each size runs in a fresh process, so max_rss_mb and import caches are per size.
+            proc = subprocess.run([sys.executable, __file__, '--_one', json.dumps([size, args.years, args.engine, args.seed, tmp])],
+                                  capture_output=True, text=True)
+            if proc.returncode != 0: print(f"{size:>10,} failed:\n{proc.stderr}"); continue
+            run = json.loads(proc.stdout.strip().splitlines()[-1]); result['runs'].append(run); p = run['phases']
+            slowest = sorted(run['components'].items(), key=lambda kv: -kv[1]['wall_s'])[:3]
+            print(f"{run['agents']:>10,} {p['arima_setup_s']:>8.2f} {p['init_s']:>8.2f} {p['run_s']:>8.2f} {p['csv_s']:>8.2f}  "
+                  + ", ".join(f"{name} {stats['wall_s']:.2f}s" for name, stats in slowest))
+    with open(args.output, 'w') as f: json.dump(result, f, indent=2)
+    print(f"Wrote {args.output}")
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1] == '--_one': print(json.dumps(run_size(*json.loads(sys.argv[2]))))
+    else: main()
@@ -0,0 +1,50 @@
+# benchmarks/check_log_sink.py
+# Checks that streaming the logs (flushed every year by mastercode02_logsink.LogSink) writes the same tables as the
+# end-of-run writer (write_and_close_csv_logs). CSV streams are compared byte for byte; Parquet and Arrow streams
+# (which need pyarrow) are read back with load_log, written as CSV the way the end-of-run writer does and compared
+# byte for byte too. Exits non-zero on any difference.
+#     python benchmarks/check_log_sink.py [--format csv|parquet|arrow] [--seeds 3 11] [--years 3] [--multiplier 0.05]
+import argparse, contextlib, filecmp, io, os, sys, tempfile
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def _as_csv(base, name, log_format):
+    """Path of a CSV holding table ``name`` of a streamed run (written from the Parquet/Arrow chunks if needed)."""
+    from mastercode02_logsink import LOG_FILES, FLOAT_FORMAT_TABLES, load_log
+    path = f"{base}_{LOG_FILES[name]}.csv"
+    if log_format == 'csv' or not os.path.exists(f"{base}_{LOG_FILES[name]}.{log_format}"): return path
+    load_log(base, name, log_format).to_csv(path, index=False, float_format='%.2f' if name in FLOAT_FORMAT_TABLES else None)
+    return path
+
+def compare(seed, years, multiplier, events, tmp, log_format='csv'):
+    from mastercode02_runner import run_simulation
+    from mastercode02_logsink import LOG_FILES
+    bases = {mode: os.path.join(tmp, f"{mode}_{seed}") for mode in ('memory', 'stream')}
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_simulation(events, seed=seed, duration=years, multiplier=multiplier, base_filename=bases['memory'])
+        run_simulation(events, seed=seed, duration=years, multiplier=multiplier, base_filename=bases['stream'], log_format=log_format)
+    problems = []
+    for name, stem in LOG_FILES.items():
+        memory, stream = f"{bases['memory']}_{stem}.csv", _as_csv(bases['stream'], name, log_format)
+        if os.path.exists(memory) != os.path.exists(stream): problems.append(f"{stem}: written by only one writer")
+        elif os.path.exists(memory) and not filecmp.cmp(memory, stream, shallow=False): problems.append(f"{stem}: contents differ")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare streamed CSV logs with the end-of-run CSV writer')
+    parser.add_argument('--format', choices=['csv', 'parquet', 'arrow'], default='csv', help='streamed log format to check')
+    parser.add_argument('--seeds', type=int, nargs='+', default=[3, 11])
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--multiplier', type=float, default=0.05)
+    args = parser.parse_args()
+    events = [{'type': 'panic', 'enabled': True, 'start_year': 1, 'end_year': 2, 'level': 2}]
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        for seed in args.seeds:
+            problems = compare(seed, args.years, args.multiplier, events, tmp, args.format)
+            print(f"{args.format} seed {seed}: " + ("identical" if not problems else "; ".join(problems)))
+            failed |= bool(problems)
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
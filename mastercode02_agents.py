@@ -1,38 +1,69 @@
 # mastercode02_agents.py
-import salabim as sim, pandas as pd, warnings, random
-from copy import deepcopy
-from statsmodels.tsa.arima.model import ARIMA
+import salabim as sim, warnings, math
+from operator import attrgetter
 import numpy as np
 from mastercode02_config_and_rates import (HISTORICAL_MACRO_DATA, HISTORICAL_ECONOMIC_DATA,
                                              INCOME_BANDS, SKILL_LEVELS, CAR_AFFORDABILITY,
                                              PUBLIC_TRANSIT_CONFIG, ROAD_NETWORK_CAPACITY,
                                              EMPLOYERS, GOV_SUPPORT_CONFIG,
-                                             COMMUTATION_PURPOSE_RATES, COMMUTATION_PURPOSES,
-                                             SIMULATION_DURATION, IMMIGRATION_CONFIG,
+                                             IMMIGRATION_CONFIG,
                                              BANK_LOAN_ANNUAL_CAPACITY, BANK_SAVINGS_ANNUAL_CAPACITY,
                                              GOVERNMENT_SPENDING_ANNUAL_CAP)
 import mastercode02_globals as g
-from mastercode02_utils import compute_household_cost
+from mastercode02_rng import stream, np_stream, agent_uniform
+from mastercode02_household import Household
+from mastercode02_utils import household_costs
+from mastercode02_forecasts import load_forecasts, MACRO_SERIES, ECONOMIC_SERIES, PATH_COLUMN
+from mastercode02_snapshot import population_snapshot
+from mastercode02_profile import touched
+from mastercode02_codes import SEXES, EDUCATION_LEVELS, EMPLOYMENT_STATUSES
+from mastercode02_vehicles import PURCHASE, INHERITANCE, RETIRED_AGE, RETIRED_NO_HEIR, NO_OWNER
 
 warnings.filterwarnings("ignore")
 
-def log_vehicle_event(year, event_type, car_id, details):
-    g.VEHICLE_EVENTS.append({'year': year, 'event': event_type, 'car_id': car_id, 'details': details})
+def log_vehicle_event(year, code, car_id, owner_id, other_id=None):
+    """Records a vehicle event code (mastercode02_vehicles); the text is only built on export."""
+    g.VEHICLE_EVENTS.append((year, code, car_id, owner_id, other_id))
+
+def _household_tracked(name, labels=None):
+    """Person attribute whose changes are pushed into the person's Household aggregates.
+
+    The value lives in the '_<name>' slot; with ``labels`` (mastercode02_codes) the slot holds its small-int code.
+    """
+    key = '_' + name; get = attrgetter(key)
+    code = {label: i for i, label in enumerate(labels)}.__getitem__ if labels else None
+    def fset(self, value):
+        setattr(self, key, value if code is None else code(value))
+        if self.household is not None: self.household.update_member(self)
+    return property(get if code is None else lambda self: labels[get(self)], fset)
 
 class Person(sim.Component):
+    # Person's own fields live in slots rather than the instance __dict__ (salabim keeps its scheduling state there);
+    # sex, education and employment_status are stored as codes into SEXES, EDUCATION_LEVELS and EMPLOYMENT_STATUSES.
+    __slots__ = ('_age', '_sex', '_education', '_employment_status', '_annual_income', 'household', 'id', 'employer', 'household_id',
+                 'marital_status', 'year_in_level', 'skill_level', 'gov_support_cum', 'cars', 'use_bus', 'accident_involvement',
+                 'commute_purpose', 'layoff_status', 'is_in_jc_school', 'years_married', 'start_age_nursery', 'start_age_elementary',
+                 'start_age_middle', 'start_age_high_school', 'start_age_college', 'start_age_masters', 'start_age_phd')
+    age = _household_tracked('age'); education = _household_tracked('education', EDUCATION_LEVELS)
+    employment_status = _household_tracked('employment_status', EMPLOYMENT_STATUSES); annual_income = _household_tracked('annual_income')
+    sex = property(lambda self: SEXES[self._sex], lambda self, value: setattr(self, '_sex', SEXES.index(value)))
+
     def __init__(self, env, initial_data, population_list):
-        super().__init__(env=env)
+        # Created as a data component and started by activate(): passivating a freshly scheduled component
+        # from outside costs a linear scan of the event list, which made every birth O(population).
+        super().__init__(env=env, process='')
+        self.household = None
         self.id = initial_data['id']; self.age = initial_data['age']; self.sex = initial_data['sex']
         self.education = initial_data['education']; self.employment_status = initial_data['employment']
         self.employer = None; self.household_id = initial_data['household_id']
         self.marital_status = initial_data.get('marital_status', 'Single'); self.year_in_level = 0
-        self.skill_level = None; self.annual_income = 0; self.gov_support_cum = 0; self.cars = []
+        self.skill_level = None; self.annual_income = 0; self.gov_support_cum = 0; self.cars = ()
         self.use_bus = False; self.accident_involvement = False; self.commute_purpose = "Other"
         self.layoff_status = False
         self.is_in_jc_school = False
         self.years_married = None
 
-        self.start_age_nursery = random.choice([2, 3]); self.start_age_elementary = self.start_age_nursery + 2
+        self.start_age_nursery = stream('education').choice([2, 3]); self.start_age_elementary = self.start_age_nursery + 2
         self.start_age_middle = self.start_age_elementary + 5; self.start_age_high_school = self.start_age_middle + 3
         self.start_age_college = self.start_age_high_school + 4; self.start_age_masters = self.start_age_college + 4
         self.start_age_phd = self.start_age_masters + 2
@@ -48,42 +79,49 @@ class Person(sim.Component):
             self.year_in_level = max(1, int(self.age - start_ages.get(self.education, self.age) + 1))
 
         population_list.append(self)
-        self.passivate()
-
-    def process(self):
-        if self.employer and self.employer in g.EMPLOYER_RESOURCE:
-            yield self.request(g.EMPLOYER_RESOURCE[self.employer])
-
+        if self.sex == 'Female' and self.marital_status == 'Never married': g.MARRIAGE_MARKET.add(self, env.now())
+
+    def process(self, resume=False):
+        # resume=True is used for persons restored from a checkpoint (mastercode02_checkpoint): they re-claim
+        # their school seat and skip the death check, which already ran this year before the snapshot.
+        if self.employer and self.employer in g.EMPLOYER_RESOURCE and not g.EMPLOYER_RESOURCE[self.employer].claim(self):
+            self.employment_status = 'Unemployed'; self.employer = None; self._assign_skill_and_income()
+        if resume and self.is_in_jc_school and self.education in g.EDUCATION_RESOURCE:
+            self.is_in_jc_school = g.EDUCATION_RESOURCE[self.education].claim(self)
+
+        # With g.HAZARD_SCHEDULING, deaths and births are fired by mastercode02_hazards.HazardManager instead,
+        # and persons born mid-year step on the next integer year like everyone else.
         while True:
-            death_prob = self.env.RATES['Death Rates'][self.sex].get(self.get_age_group(), 0) * g.arima_death_rate_modifier * g.event_death_rate_modifier
-            if random.random() < death_prob:
-                self.die()
-                break
+            if not g.HAZARD_SCHEDULING:
+                death_prob = self.env.RATES['Death Rates'][self.sex].get(self.get_age_group(), 0) * g.arima_death_rate_modifier * g.event_death_rate_modifier
+                if not resume and agent_uniform('mortality', self.id, int(self.env.now())) < death_prob:
+                    self.die()
+                    break
+            resume = False
 
-            yield self.hold(1)
-            self.age += 1
+            yield self.hold(till=math.floor(self.env.now()) + 1)
+            touched(1); self.age += 1
 
             if self.years_married is not None:
                 self.years_married += 1
 
             self.update_education_cyclical()
-            yield from self.update_employment_status()
 
-            if self.sex == 'Female' and 15 <= self.age < 50:
+            if self.sex == 'Female' and 15 <= self.age < 50 and not g.HAZARD_SCHEDULING:
                 base_birth_prob = self.env.RATES['Fertility Rate']['Married' if 'Married' in self.marital_status else 'Unmarried'].get(self.get_age_group(), 0)
                 final_birth_prob = base_birth_prob * g.arima_birth_rate_modifier * g.event_birth_rate_modifier
                 if self.years_married is not None and self.years_married <= 10:
                     final_birth_prob *= 1.5
-                if random.random() < final_birth_prob:
+                if agent_uniform('fertility', self.id, int(self.env.now())) < final_birth_prob:
                     self.give_birth(g.HOUSEHOLDS, g.POPULATION)
             
             self._update_income_annually()
             self._manage_car_lifecycle()
             self._decide_on_car_purchase()
-            self._update_commute_details()
 
     def update_education_cyclical(self):
-        if self.education in ['High School (9-12)', 'University'] and random.random() < g.event_dropout_prob:
+        rng = stream('education')
+        if self.education in ['High School (9-12)', 'University'] and rng.random() < g.event_dropout_prob:
             self.education = 'high_school_dropout' if self.education == 'High School (9-12)' else 'college_dropout'
             self.year_in_level = 0
             return
@@ -96,23 +134,22 @@ class Person(sim.Component):
         elif self.year_in_level > 2 and current_level == 'Nursery/Preschool': self.education = 'Elementary (K-5)'; self.year_in_level = 1
         elif self.year_in_level > 5 and current_level == 'Elementary (K-5)': self.education = 'Middle (6-8)'; self.year_in_level = 1
         elif self.year_in_level > 3 and current_level == 'Middle (6-8)': self.education = 'High School (9-12)'; self.year_in_level = 1
-        elif self.year_in_level > 4 and current_level == 'High School (9-12)': self.education = 'high_school_completed' if random.random() < 0.95 else 'high_school_dropout'; self.year_in_level = 0
+        elif self.year_in_level > 4 and current_level == 'High School (9-12)': self.education = 'high_school_completed' if rng.random() < 0.95 else 'high_school_dropout'; self.year_in_level = 0
         elif self.education == 'high_school_completed' and self.age >= self.start_age_college:
-            if random.random() < 0.60: self.education = 'University'; self.year_in_level = 1
-        elif self.year_in_level > 4 and current_level == 'University': self.education = 'college_completed' if random.random() < 0.75 else 'college_dropout'; self.year_in_level = 0
+            if rng.random() < 0.60: self.education = 'University'; self.year_in_level = 1
+        elif self.year_in_level > 4 and current_level == 'University': self.education = 'college_completed' if rng.random() < 0.75 else 'college_dropout'; self.year_in_level = 0
         elif self.education == 'college_completed' and self.age >= self.start_age_masters:
-            if random.random() < 0.10: self.education = 'masters_program'; self.year_in_level = 1
-        elif self.year_in_level > 2 and current_level == 'masters_program': self.education = 'masters_completed' if random.random() < 0.90 else 'masters_dropout'; self.year_in_level = 0
+            if rng.random() < 0.10: self.education = 'masters_program'; self.year_in_level = 1
+        elif self.year_in_level > 2 and current_level == 'masters_program': self.education = 'masters_completed' if rng.random() < 0.90 else 'masters_dropout'; self.year_in_level = 0
         elif self.education == 'masters_completed' and self.age >= self.start_age_phd:
-             if random.random() < 0.05: self.education = 'phd_program'; self.year_in_level = 1
+             if rng.random() < 0.05: self.education = 'phd_program'; self.year_in_level = 1
         elif self.year_in_level > 4 and current_level == 'phd_program': self.education = 'phd_completed'; self.year_in_level = 0
 
     def die(self):
         current_year = int(self.env.now())
         if self.is_in_jc_school:
             res = g.EDUCATION_RESOURCE.get(self.education)
-            if res and res in self.claimed_resources():
-                self.release(res)
+            if res: res.release(self)
         if self.cars:
             household = g.HOUSEHOLDS.get(self.household_id)
             if household and household.get('members'):
@@ -120,28 +157,33 @@ class Person(sim.Component):
                 if other_members:
                     heir = sorted(other_members, key=lambda p: p.age, reverse=True)[0]
                     for car in self.cars:
-                        heir.cars.append(car)
-                        log_vehicle_event(current_year, 'Inheritance', car['id'], f"Owner {self.id} died, car inherited by Person {heir.id}")
+                        g.VEHICLES.owner[car] = heir.id; log_vehicle_event(current_year, INHERITANCE, car, self.id, heir.id)
+                    heir.cars += self.cars; heir.cars_changed()
                 else:
-                    for car in self.cars: log_vehicle_event(current_year, 'Retirement', car['id'], f"Owner {self.id} died, no heir in household.")
-        if self.employer and self.employer in g.EMPLOYER_RESOURCE and g.EMPLOYER_RESOURCE[self.employer] in self.claimed_resources():
-            self.release(g.EMPLOYER_RESOURCE[self.employer])
+                    for car in self.cars:
+                        g.VEHICLES.owner[car] = NO_OWNER; log_vehicle_event(current_year, RETIRED_NO_HEIR, car, self.id)
+        if self.employer and self.employer in g.EMPLOYER_RESOURCE: g.EMPLOYER_RESOURCE[self.employer].release(self)
         household = g.HOUSEHOLDS.get(self.household_id)
-        if household and self in household.get('members', []):
+        if household and self in household.get('members', ()):
             household['deaths'] = household.get('deaths', 0) + 1
-            household['members'].remove(self)
-        if self in g.POPULATION:
-            g.POPULATION.remove(self)
+            household.remove_member(self)
+        g.POPULATION.discard(self)
+        g.MARRIAGE_MARKET.discard(self)
         self.cancel()
 
+    def cars_changed(self):
+        """Call after changing ``cars`` (a tuple of g.VEHICLES ids), so the household car count follows."""
+        if self.household is not None: self.household.update_member(self)
+
     def _manage_car_lifecycle(self):
         if not self.cars: return
-        current_year = int(self.env.now())
-        for car in self.cars[:]:
-            car['age'] = car.get('age', 0) + 1
-            if car['age'] > 10:
-                self.cars.remove(car)
-                log_vehicle_event(current_year, 'Retirement', car['id'], f"Car retired due to age. Owner: {self.id}")
+        current_year = int(self.env.now()); vehicles = g.VEHICLES; kept = []
+        for car in self.cars:
+            vehicles.age[car] += 1
+            if vehicles.age[car] > 10:
+                vehicles.owner[car] = NO_OWNER; log_vehicle_event(current_year, RETIRED_AGE, car, self.id)
+            else: kept.append(car)
+        self.cars = tuple(kept); self.cars_changed()
 
     def _decide_on_car_purchase(self):
         if self.age < 18 or self.cars: return
@@ -150,10 +192,10 @@ class Person(sim.Component):
         if household.get('total_income', 0) > CAR_AFFORDABILITY['min_household_income_threshold']:
             prob = 0.10
             if self.employment_status == 'Employed': prob = 0.30
-            if random.random() < prob:
-                new_car_id = g.next_car_id()
-                self.cars.append({'id': new_car_id, 'age': 0})
-                log_vehicle_event(int(self.env.now()), 'Purchase', new_car_id, f"Purchased by Person {self.id} in HH {self.household_id}")
+            if stream('cars').random() < prob:
+                new_car_id = g.VEHICLES.add(self.id)
+                self.cars += (new_car_id,); self.cars_changed()
+                log_vehicle_event(int(self.env.now()), PURCHASE, new_car_id, self.id, self.household_id)
 
     def _assign_skill_and_income(self):
         if self.employment_status != 'Employed' or not self.employer:
@@ -169,61 +211,40 @@ class Person(sim.Component):
             return
         employer_name = employer_data['name']
         skill_index = SKILL_LEVELS.index(self.skill_level); income_range = INCOME_BANDS[employer_name][skill_index]
-        base_income = random.uniform(income_range[0], income_range[1])
+        base_income = stream('labour').uniform(income_range[0], income_range[1])
         self.annual_income = base_income * g.event_income_modifier
 
     def _update_income_annually(self):
         if self.annual_income > 0:
             self.annual_income *= (1 + self.env.salary_inflation)
 
-    def _update_commute_details(self):
-        age_group = '0-4' if self.age <= 4 else '5-17' if self.age <= 17 else '18-24' if self.age <= 24 else '25-54' if self.age <= 54 else '55-64' if self.age <= 64 else '65+'
-        weights = COMMUTATION_PURPOSE_RATES[age_group]
-        self.commute_purpose = random.choices(COMMUTATION_PURPOSES, weights=weights, k=1)[0]
-        g.TRIP_SUMMARY.append({'year': int(self.env.now()), 'purpose': self.commute_purpose})
-        if self.cars:
-            self.use_bus = False
-
-    def update_employment_status(self):
-        if self.employment_status == 'Employed' and random.random() < 0.05:
-            self.layoff_status = True; self.employment_status = 'Unemployed'
-            if self.employer and self.employer in g.EMPLOYER_RESOURCE and g.EMPLOYER_RESOURCE[self.employer] in self.claimed_resources():
-                yield self.release(g.EMPLOYER_RESOURCE[self.employer])
-            self.employer = None; self._assign_skill_and_income()
-        if self.employment_status in ['Not in Labor Force', 'Unemployed'] and 18 <= self.age < 65:
-            job_chance = self.env.RATES['Employment']['Employed'].get(self.get_age_group(), 0) * g.event_employment_rate_modifier
-            if random.random() < job_chance:
-                available = {n: r for n, r in g.EMPLOYER_RESOURCE.items() if r.available_quantity() > 0}
-                if available:
-                    chosen = random.choice(list(available.keys())); yield self.request(g.EMPLOYER_RESOURCE[chosen])
-                    self.employment_status = 'Employed'; self.employer = chosen; self._assign_skill_and_income()
-
     def get_age_group(self):
-        if self.age <= 4: return '0-4'
-        if self.age <= 9: return '5-9'
-        if self.age <= 14: return '10-14'
-        if self.age <= 19: return '15-19'
-        if self.age <= 24: return '20-24'
-        if self.age <= 29: return '25-29'
-        if self.age <= 34: return '30-34'
-        if self.age <= 39: return '35-39'
-        if self.age <= 44: return '40-44'
-        if self.age <= 49: return '45-49'
-        if self.age <= 54: return '50-54'
-        if self.age <= 59: return '55-59'
-        if self.age <= 64: return '60-64'
-        if self.age <= 69: return '65-69'
-        if self.age <= 74: return '70-74'
-        if self.age <= 79: return '75-79'
-        if self.age <= 84: return '80-84'
+        age = self.age
+        if age <= 4: return '0-4'
+        if age <= 9: return '5-9'
+        if age <= 14: return '10-14'
+        if age <= 19: return '15-19'
+        if age <= 24: return '20-24'
+        if age <= 29: return '25-29'
+        if age <= 34: return '30-34'
+        if age <= 39: return '35-39'
+        if age <= 44: return '40-44'
+        if age <= 49: return '45-49'
+        if age <= 54: return '50-54'
+        if age <= 59: return '55-59'
+        if age <= 64: return '60-64'
+        if age <= 69: return '65-69'
+        if age <= 74: return '70-74'
+        if age <= 79: return '75-79'
+        if age <= 84: return '80-84'
         return '85+'
 
     def give_birth(self, households, population_list):
         new_id = g.next_person_id()
-        initial_data = {'id': new_id, 'age': 0, 'sex': random.choice(['Male', 'Female']), 'education': 'too_young', 'employment': 'Too Young', 'household_id': self.household_id, 'marital_status': 'Never married'}
+        initial_data = {'id': new_id, 'age': 0, 'sex': stream('fertility').choice(['Male', 'Female']), 'education': 'too_young', 'employment': 'Too Young', 'household_id': self.household_id, 'marital_status': 'Never married'}
         new_person = Person(self.env, initial_data, population_list)
         if self.household_id in households:
-            households[self.household_id]['members'].append(new_person)
+            households[self.household_id].add_member(new_person)
             households[self.household_id]['births'] = households[self.household_id].get('births', 0) + 1
         new_person.activate()
 
@@ -232,20 +253,18 @@ class EducationManager(sim.Component):
     def process(self):
         while True:
             yield self.hold(1)
-            all_students = [p for p in g.POPULATION if p.is_in_jc_school]
-            for student in all_students:
-                res = g.EDUCATION_RESOURCE.get(student.education)
-                if res and res in student.claimed_resources():
-                    student.release(res)
-                student.is_in_jc_school = False
+            snapshot = population_snapshot(self.env)
+            touched(len(snapshot.students) + sum(len(snapshot.by_education.get(level_name, ())) for level_name in g.EDUCATION_RESOURCE))
+            for student in snapshot.students: student.is_in_jc_school = False
+            for resource in g.EDUCATION_RESOURCE.values(): resource.clear()
             for level_name, resource in g.EDUCATION_RESOURCE.items():
-                eligible_students = [p for p in g.POPULATION if p.education == level_name]
-                random.shuffle(eligible_students)
+                eligible_students = list(snapshot.by_education.get(level_name, []))
+                stream('education').shuffle(eligible_students)
                 available_seats = int(resource.capacity())
                 enrolled_count = 0
                 for student in eligible_students:
                     if enrolled_count < available_seats:
-                        student.request(resource)
+                        resource.claim(student)
                         student.is_in_jc_school = True
                         enrolled_count += 1
                     else:
@@ -293,13 +312,8 @@ class WorldManager(sim.Component):
         g.arima_marriage_rate_modifier = 1.0
         self._train_models()
     def _train_models(self):
-        df = pd.DataFrame(HISTORICAL_MACRO_DATA); df.set_index('Year', inplace=True)
-        for column in ['Mortality Rate', 'Birth Rate', 'Employment Rate']:
-            try:
-                model = ARIMA(df[column], order=(1, 1, 1)).fit()
-                pred = model.get_forecast(steps=SIMULATION_DURATION + 1)
-                self.forecasts[column] = {'mean': pred.predicted_mean,'stderr': pred.se_mean,'base_value': df[column].iloc[-1]}
-            except Exception as e: print(f"ARIMA training failed for {column}: {e}")
+        self.forecasts = load_forecasts(HISTORICAL_MACRO_DATA, MACRO_SERIES)
+        for column, forecast in self.forecasts.items(): forecast['base_value'] = HISTORICAL_MACRO_DATA[column][-1]
     def process(self):
         while True:
             yield self.hold(1)
@@ -308,8 +322,8 @@ class WorldManager(sim.Component):
             try:
                 for rate_name, g_modifier_name in [('Mortality Rate', 'arima_death_rate_modifier'),('Birth Rate', 'arima_birth_rate_modifier'),('Employment Rate', 'arima_marriage_rate_modifier')]:
                     forecast_data = self.forecasts[rate_name]
-                    mean = forecast_data['mean'].iloc[year]; stderr = forecast_data['stderr'].iloc[year]
-                    stochastic_forecast = np.random.normal(loc=mean, scale=stderr)
+                    mean = forecast_data['mean'][year]; stderr = forecast_data['stderr'][year]
+                    stochastic_forecast = np_stream('world').normal(loc=mean, scale=stderr) if g.MACRO_PATH is None else g.MACRO_PATH[year, PATH_COLUMN[rate_name]]
                     scaling_factor = stochastic_forecast / forecast_data['base_value'] if forecast_data['base_value'] != 0 else 1
                     setattr(g, g_modifier_name, scaling_factor)
             except Exception as e: print(f"Error in WorldManager process: {e}")
@@ -318,17 +332,12 @@ class EconomicManager(sim.Component):
     def __init__(self, env):
         super().__init__(env=env); self.forecasts = {}; self._train_models(); self.update_env_rates(0)
     def _train_models(self):
-        df = pd.DataFrame(HISTORICAL_ECONOMIC_DATA); df.set_index('Year', inplace=True)
-        for column in ['Top Tax Rate', 'Salary Inflation', 'Cost Inflation (CPI)', '30-Yr Mortgage']:
-            try:
-                model = ARIMA(df[column], order=(1, 1, 1)).fit()
-                pred = model.get_forecast(steps=SIMULATION_DURATION + 1)
-                self.forecasts[column] = {'mean': pred.predicted_mean, 'stderr': pred.se_mean}
-            except Exception as e: print(f"ARIMA training failed for {column}: {e}")
+        self.forecasts = load_forecasts(HISTORICAL_ECONOMIC_DATA, ECONOMIC_SERIES)
     def update_env_rates(self, year):
         for rate_name, env_var in [('Top Tax Rate', 'tax_rate'), ('Salary Inflation', 'salary_inflation'), ('Cost Inflation (CPI)', 'cpi_inflation'), ('30-Yr Mortgage', 'mortgage_rate')]:
-            forecast_data = self.forecasts[rate_name]; mean = forecast_data['mean'].iloc[year]; stderr = forecast_data['stderr'].iloc[year]
-            stochastic_forecast = np.random.normal(loc=mean, scale=stderr); base_rate = stochastic_forecast / 100
+            forecast_data = self.forecasts[rate_name]; mean = forecast_data['mean'][year]; stderr = forecast_data['stderr'][year]
+            stochastic_forecast = np_stream('economy').normal(loc=mean, scale=stderr) if g.MACRO_PATH is None else g.MACRO_PATH[year, PATH_COLUMN[rate_name]]
+            base_rate = stochastic_forecast / 100
             if env_var == 'cpi_inflation': base_rate *= g.event_inflation_modifier
             setattr(self.env, env_var, base_rate)
     def process(self):
@@ -338,66 +347,93 @@ class EconomicManager(sim.Component):
             try: self.update_env_rates(year)
             except Exception as e: print(f"Error in EconomicManager process: {e}")
 
+def settle_household_finances(env, households):
+    """One year of income, taxes and required cost for every non-empty household, from its member aggregates.
+
+    Surpluses repay loans and then go to savings, deficits are borrowed; both draw on the bank's annual
+    capacities in household order.
+    """
+    households = [hh for hh in households if hh.adults + hh.children]; n = len(households); touched(n)
+    composition = [np.fromiter((getattr(hh, attr) for hh in households), dtype=np.int64, count=n) for attr in ('adults', 'children', 'working_adults')]
+    incomes = np.fromiter((hh.income for hh in households), dtype=float, count=n)
+    costs = household_costs(*composition, 1 + env.cpi_inflation); all_taxes = incomes * env.tax_rate
+    all_net = (incomes - all_taxes) - costs
+    for hh_data, total_income, required_cost, taxes, net_income_minus_cost in zip(households, incomes.tolist(), costs.tolist(), all_taxes.tolist(), all_net.tolist()):
+        savings = hh_data.get('savings_balance', 0); loans = hh_data.get('loan_balance', 0); loan_repaid = hh_data.get('loan_repaid_cum', 0)
+        if net_income_minus_cost > 0:
+            repayment = min(net_income_minus_cost, loans)
+            if repayment > 0: loans -= repayment; loan_repaid += repayment; net_income_minus_cost -= repayment
+            surplus = net_income_minus_cost
+            if g.annual_savings_accepted + surplus <= BANK_SAVINGS_ANNUAL_CAPACITY: g.annual_savings_accepted += surplus; savings += surplus
+            else: g.refused_log['savings'] += 1
+        else:
+            deficit = abs(net_income_minus_cost)
+            if g.annual_loans_disbursed + deficit <= BANK_LOAN_ANNUAL_CAPACITY: g.annual_loans_disbursed += deficit; loans += deficit
+            else: g.refused_log['loans'] += 1
+        hh_data.update({'total_income': total_income, 'required_cost': required_cost, 'savings_balance': savings, 'loan_balance': loans, 'loan_repaid_cum': loan_repaid, 'taxes_cum': hh_data.get('taxes_cum', 0) + taxes})
+
 class HouseholdFinanceManager(sim.Component):
     def process(self):
         while True:
             yield self.hold(1)
-            for hh_id, hh_data in g.HOUSEHOLDS.items():
-                members = hh_data.get('members', [])
-                if not members: continue
-                total_income = sum(p.annual_income for p in members); cpi_multiplier = 1 + self.env.cpi_inflation
-                required_cost = compute_household_cost(members, cpi_multiplier); taxes = total_income * self.env.tax_rate
-                net_income_minus_cost = (total_income - taxes) - required_cost
-                savings = hh_data.get('savings_balance', 0); loans = hh_data.get('loan_balance', 0); loan_repaid = hh_data.get('loan_repaid_cum', 0)
-                if net_income_minus_cost > 0:
-                    repayment = min(net_income_minus_cost, loans)
-                    if repayment > 0: loans -= repayment; loan_repaid += repayment; net_income_minus_cost -= repayment
-                    surplus = net_income_minus_cost
-                    if g.annual_savings_accepted + surplus <= BANK_SAVINGS_ANNUAL_CAPACITY: g.annual_savings_accepted += surplus; savings += surplus
-                    else: g.refused_log['savings'] += 1
-                else:
-                    deficit = abs(net_income_minus_cost)
-                    if g.annual_loans_disbursed + deficit <= BANK_LOAN_ANNUAL_CAPACITY: g.annual_loans_disbursed += deficit; loans += deficit
-                    else: g.refused_log['loans'] += 1
-                hh_data.update({'total_income': total_income, 'required_cost': required_cost, 'savings_balance': savings, 'loan_balance': loans, 'loan_repaid_cum': loan_repaid, 'taxes_cum': hh_data.get('taxes_cum', 0) + taxes})
+            settle_household_finances(self.env, g.HOUSEHOLDS.values())
+
+def update_bus_fleet(env, population):
+    """Sizes the bus fleet to the population and sets this year's daily bus capacity on env."""
+    env.bus_fleet_size = int(np.ceil(population * (PUBLIC_TRANSIT_CONFIG['initial_buses'] / PUBLIC_TRANSIT_CONFIG['initial_population'])))
+    env.total_bus_capacity = env.bus_fleet_size * PUBLIC_TRANSIT_CONFIG['bus_capacity'] * PUBLIC_TRANSIT_CONFIG['trips_per_bus_per_day']
+
+def serve_bus_demand(env, bus_demand):
+    """Records how many of ``bus_demand`` would-be passengers the buses serve; returns the share served."""
+    bus_capacity = getattr(env, 'total_bus_capacity', 0)
+    service_ratio = min(1.0, bus_capacity / bus_demand if bus_demand > 0 else 1.0)
+    served_passengers = int(bus_demand * service_ratio)
+    env.bus_passengers_served = served_passengers; env.bus_passengers_refused = bus_demand - served_passengers
+    return service_ratio
 
 class PublicTransitManager(sim.Component):
     def process(self):
-        ratio = PUBLIC_TRANSIT_CONFIG['initial_buses'] / PUBLIC_TRANSIT_CONFIG['initial_population']
         while True:
-            current_pop = len(g.POPULATION); self.env.bus_fleet_size = int(np.ceil(current_pop * ratio))
-            daily_capacity = self.env.bus_fleet_size * PUBLIC_TRANSIT_CONFIG['bus_capacity'] * PUBLIC_TRANSIT_CONFIG['trips_per_bus_per_day']
-            self.env.total_bus_capacity = daily_capacity; yield self.hold(1)
+            update_bus_fleet(self.env, len(g.POPULATION)); yield self.hold(1)
 
 class CommuteManager(sim.Component):
     def process(self):
         while True:
             yield self.hold(1)
-            bus_demand = sum(1 for p in g.POPULATION if not p.cars and p.commute_purpose in ['Work', 'School'])
-            bus_capacity = getattr(self.env, 'total_bus_capacity', 0)
-            service_ratio = min(1.0, bus_capacity / bus_demand if bus_demand > 0 else 1.0)
-            served_passengers = int(bus_demand * service_ratio)
-            self.env.bus_passengers_served = served_passengers; self.env.bus_passengers_refused = bus_demand - served_passengers
-            for p in g.POPULATION:
-                if not p.cars and p.commute_purpose in ['Work', 'School']: p.use_bus = True if random.random() < service_ratio else False
-                else: p.use_bus = False
+            snapshot = population_snapshot(self.env); service_ratio = serve_bus_demand(self.env, len(snapshot.bus_candidates))
+            touched(len(snapshot.bus_users) + len(snapshot.bus_candidates))
+            for p in snapshot.bus_users: p.use_bus = False
+            for p in snapshot.bus_candidates: p.use_bus = stream('transit').random() < service_ratio
+
+def _credit_gov_support(adult, amount):
+    if adult is not None: adult.gov_support_cum += amount
+
+def disburse_gov_support(households):
+    """Single-parent support and food stamps for every household with children, within this year's government cap.
+
+    Reads the households' member aggregates and credits the support to their cached adult_members; households
+    of the array engine (mastercode02_cohort) have no member objects, so there it only counts against the cap.
+    """
+    current_gov_cap = GOVERNMENT_SPENDING_ANNUAL_CAP * g.event_gov_cap_modifier; touched(len(households))
+    for hh_data in households:
+        n_adults = hh_data.adults; n_children = hh_data.children
+        if n_children == 0: continue
+        adults = hh_data.adult_members.values() or (None,) * n_adults
+        if n_adults == 1:
+            support_amount = GOV_SUPPORT_CONFIG['single_parent_support'] * g.event_gov_support_modifier
+            if g.annual_gov_support_disbursed + support_amount <= current_gov_cap: g.annual_gov_support_disbursed += support_amount; _credit_gov_support(next(iter(adults)), support_amount)
+            else: g.refused_log['gov_support'] += 1
+        if hh_data.get('total_income', 0) > 0 and hh_data.get('total_income', 0) < hh_data.get('required_cost', 0) * GOV_SUPPORT_CONFIG['low_income_threshold_factor']:
+            support_per_adult = (n_children * GOV_SUPPORT_CONFIG['food_stamp_per_child'] * g.event_gov_support_modifier) / n_adults if n_adults else 0
+            for adult in adults:
+                if g.annual_gov_support_disbursed + support_per_adult <= current_gov_cap: g.annual_gov_support_disbursed += support_per_adult; _credit_gov_support(adult, support_per_adult)
+                else: g.refused_log['gov_support'] += 1
 
 class GovernmentManager(sim.Component):
     def process(self):
         while True:
             yield self.hold(1)
-            current_gov_cap = GOVERNMENT_SPENDING_ANNUAL_CAP * g.event_gov_cap_modifier
-            for hh_id, hh_data in g.HOUSEHOLDS.items():
-                members = hh_data.get('members', []); adults = [p for p in members if p.age >= 18]; children = [p for p in members if p.age < 18]
-                if len(adults) == 1 and len(children) > 0:
-                    support_amount = GOV_SUPPORT_CONFIG['single_parent_support'] * g.event_gov_support_modifier
-                    if g.annual_gov_support_disbursed + support_amount <= current_gov_cap: g.annual_gov_support_disbursed += support_amount; adults[0].gov_support_cum += support_amount
-                    else: g.refused_log['gov_support'] += 1
-                if len(children) > 0 and hh_data.get('total_income', 0) > 0 and hh_data.get('total_income', 0) < hh_data.get('required_cost', 0) * GOV_SUPPORT_CONFIG['low_income_threshold_factor']:
-                    support_per_adult = (len(children) * GOV_SUPPORT_CONFIG['food_stamp_per_child'] * g.event_gov_support_modifier) / len(adults) if adults else 0
-                    for adult in adults:
-                        if g.annual_gov_support_disbursed + support_per_adult <= current_gov_cap: g.annual_gov_support_disbursed += support_per_adult; adult.gov_support_cum += support_per_adult
-                        else: g.refused_log['gov_support'] += 1
+            disburse_gov_support(g.HOUSEHOLDS.values())
 
 class MarriageManager(sim.Component):
     def __init__(self, env, households, population, marriages):
@@ -405,45 +441,51 @@ class MarriageManager(sim.Component):
     def process(self):
         while True:
             yield self.hold(1)
-            eligible_males = [p for p in self.population if not p.ispassive() and p.sex == 'Male' and p.age >= 22 and p.marital_status == 'Never married']
-            random.shuffle(eligible_males)
+            eligible_males = list(population_snapshot(self.env).eligible_males)
+            stream('marriage').shuffle(eligible_males); touched(len(eligible_males))
             for male in eligible_males:
                 marriage_prob = 0.40 * g.arima_marriage_rate_modifier
-                if random.random() < marriage_prob:
-                    eligible_females = [p for p in self.population if not p.ispassive() and p.sex == 'Female' and p.marital_status == 'Never married' and abs(p.age - male.age) <= 5]
-                    if eligible_females:
-                        female = random.choice(eligible_females); new_hh_id = g.next_household_id()
+                if stream('marriage').random() < marriage_prob:
+                    female = g.MARRIAGE_MARKET.draw(male.age, self.env.now(), rng=stream('marriage'))
+                    if female is not None:
+                        new_hh_id = g.next_household_id()
                         self.form_new_household(male, female, new_hh_id)
                         male.marital_status = 'Married'; female.marital_status = 'Married'
+                        g.MARRIAGE_MARKET.discard(female); touched(1)
     def form_new_household(self, person1, person2, new_hh_id):
         male, female = (person1, person2) if person1.sex == 'Male' else (person2, person1)
         male.years_married = 0; female.years_married = 0
         man_former_hh, woman_former_hh = male.household_id, female.household_id
-        if man_former_hh in g.HOUSEHOLDS and male in g.HOUSEHOLDS[man_former_hh]['members']: g.HOUSEHOLDS[man_former_hh]['members'].remove(male)
-        if woman_former_hh in g.HOUSEHOLDS and female in g.HOUSEHOLDS[woman_former_hh]['members']: g.HOUSEHOLDS[woman_former_hh]['members'].remove(female)
-        g.HOUSEHOLDS[new_hh_id] = {'id': new_hh_id, 'type': 'Married-couple family household', 'members': [male, female], 'births': 0, 'deaths': 0, 'marriages': 1}
+        if man_former_hh in g.HOUSEHOLDS: g.HOUSEHOLDS[man_former_hh].discard_member(male)
+        if woman_former_hh in g.HOUSEHOLDS: g.HOUSEHOLDS[woman_former_hh].discard_member(female)
+        g.HOUSEHOLDS[new_hh_id] = Household(members=[male, female], id=new_hh_id, type='Married-couple family household', births=0, deaths=0, marriages=1)
         male.household_id = new_hh_id; female.household_id = new_hh_id
         marriage_id = f"M_{int(self.env.now())}_{g.next_marriage_id()}"
         g.MARRIAGES.append({'marriage_id': marriage_id, 'man_id': male.id, 'man_former_hh': man_former_hh, 'man_age': male.age, 'woman_id': female.id, 'woman_former_hh': woman_former_hh, 'woman_age': female.age, 'new_hh_id': new_hh_id, 'year_of_marriage': int(self.env.now())})
 
+def road_accident_probability(car_commuters):
+    """Sets this year's road status and average wait in g.ANNUAL_SUMMARY_DATA for ``car_commuters`` cars on the road;
+    returns the yearly accident probability per car owner."""
+    total_wait_time = 0; status = {}
+    for road_type, capacity in ROAD_NETWORK_CAPACITY.items():
+        load_factor = car_commuters / capacity if capacity > 0 else 0; road_wait_time = 0
+        if load_factor < 0.7: status[road_type] = 'Normal'
+        elif load_factor < 1.0: status[road_type] = 'Congested'; road_wait_time = (load_factor - 0.7) * 30
+        else: status[road_type] = 'Gridlock'; road_wait_time = 9 + (load_factor - 1.0) * 60
+        total_wait_time += road_wait_time
+    g.ANNUAL_SUMMARY_DATA['traffic_status'] = status; g.ANNUAL_SUMMARY_DATA['avg_wait_time'] = total_wait_time / 3 if len(ROAD_NETWORK_CAPACITY) > 0 else 0
+    if status.get('interstate') == 'Gridlock' or status.get('highway') == 'Gridlock': return 0.015
+    return 0.005
+
 class TrafficManager(sim.Component):
     def process(self):
         while True:
-            yield self.hold(1); car_commuters = sum(len(p.cars) for p in g.POPULATION if not p.ispassive())
-            total_wait_time = 0; status = {}
-            for road_type, capacity in ROAD_NETWORK_CAPACITY.items():
-                load_factor = car_commuters / capacity if capacity > 0 else 0; road_wait_time = 0
-                if load_factor < 0.7: status[road_type] = 'Normal'
-                elif load_factor < 1.0: status[road_type] = 'Congested'; road_wait_time = (load_factor - 0.7) * 30
-                else: status[road_type] = 'Gridlock'; road_wait_time = 9 + (load_factor - 1.0) * 60
-                total_wait_time += road_wait_time
-            g.ANNUAL_SUMMARY_DATA['traffic_status'] = status; g.ANNUAL_SUMMARY_DATA['avg_wait_time'] = total_wait_time / 3 if len(ROAD_NETWORK_CAPACITY) > 0 else 0
-            accident_prob = 0.005
-            if status.get('interstate') == 'Gridlock' or status.get('highway') == 'Gridlock': accident_prob = 0.015
-            num_accidents = 0
-            for p in g.POPULATION:
-                if p.cars and random.random() < accident_prob: p.accident_involvement = True; num_accidents += 1
-                else: p.accident_involvement = False
+            yield self.hold(1); snapshot = population_snapshot(self.env)
+            accident_prob = road_accident_probability(snapshot.active_cars); num_accidents = 0
+            touched(len(snapshot.accident_involved) + len(snapshot.car_owners))
+            for p in snapshot.accident_involved: p.accident_involvement = False
+            for p in snapshot.car_owners:
+                if stream('accidents').random() < accident_prob: p.accident_involvement = True; num_accidents += 1
             g.ANNUAL_SUMMARY_DATA['num_accidents'] = num_accidents
 
 class ImmigrationManager(sim.Component):
@@ -454,12 +496,13 @@ class ImmigrationManager(sim.Component):
             economic_multiplier = max(0, g.latest_economic_index / 50.0)
             num_to_add = int(base_immigrants * economic_multiplier)
             if num_to_add > 0: print(f"ImmigrationManager: Adding {num_to_add} new agents this year.")
+            touched(num_to_add)
             for _ in range(num_to_add):
-                age = random.randint(*IMMIGRATION_CONFIG['age_range'])
+                age = stream('immigration').randint(*IMMIGRATION_CONFIG['age_range'])
                 education_levels = list(IMMIGRATION_CONFIG['education_distribution'].keys()); weights = list(IMMIGRATION_CONFIG['education_distribution'].values())
-                education = random.choices(education_levels, weights=weights, k=1)[0]
-                initial_data = {'id': g.next_person_id(),'age': age,'sex': random.choice(['Male', 'Female']),'education': education,'employment': 'Unemployed','household_id': None,'marital_status': 'Never married'}
+                education = stream('immigration').choices(education_levels, weights=weights, k=1)[0]
+                initial_data = {'id': g.next_person_id(),'age': age,'sex': stream('immigration').choice(['Male', 'Female']),'education': education,'employment': 'Unemployed','household_id': None,'marital_status': 'Never married'}
                 new_person = Person(self.env, initial_data, g.POPULATION)
                 new_hh_id = g.next_household_id()
-                g.HOUSEHOLDS[new_hh_id] = {'id': new_hh_id, 'type': 'Nonfamily household', 'members': [new_person]}
-                new_person.household_id = new_hh_id; new_person.activate()
\ No newline at end of file
+                g.HOUSEHOLDS[new_hh_id] = Household(members=[new_person], id=new_hh_id, type='Nonfamily household')
+                new_person.household_id = new_hh_id; new_person.activate(); population_snapshot(self.env).add(new_person)
\ No newline at end of file
@@ -0,0 +1,32 @@
+# mastercode02_cache.py
+import hashlib, json, os
+import numpy as np
+
+# --- On-disk cache for derived inputs (synthetic populations, fitted forecasts) ---
+CACHE_DIR = os.environ.get('MASTERCODE02_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.mastercode02_cache'))
+
+def cache_key(*parts):
+    """Stable hash of any JSON-serialisable inputs (dict keys are sorted)."""
+    payload = json.dumps(parts, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()[:24]
+
+def _path(kind, key):
+    return os.path.join(CACHE_DIR, f"{kind}_{key}.npz")
+
+def load_arrays(kind, key):
+    """Returns the cached {name: ndarray} for (kind, key), or None on a miss or unreadable file."""
+    path = _path(kind, key)
+    if not os.path.exists(path): return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            return {name: data[name] for name in data.files}
+    except (OSError, ValueError) as e:
+        print(f"Cache: ignoring unreadable {path}: {e}")
+        return None
+
+def save_arrays(kind, key, arrays):
+    """Writes arrays atomically, so parallel runs sharing the cache never read a partial file."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _path(kind, key); tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f: np.savez(f, **arrays)
+    os.replace(tmp, path)
@@ -0,0 +1,49 @@
+# mastercode02_capacity.py
+
+class CapacityPool:
+    """Counter-based seat pool for employers and schools, in place of a salabim Resource.
+
+    Nobody ever queues for a job or a school seat, so a claim is granted at once or refused, with no
+    event-list bookkeeping. The read methods keep the Resource names (name(), capacity(), claimed_quantity(),
+    available_quantity(), requesters()), so the resource summary logs the same numbers.
+    """
+    __slots__ = ('_name', '_capacity', '_holders')
+
+    def __init__(self, name, capacity):
+        self._name = name; self._capacity = capacity; self._holders = set()
+
+    def __repr__(self):
+        return f"CapacityPool({self._name!r}, {len(self._holders)}/{self._capacity})"
+
+    def name(self):
+        return self._name
+
+    def capacity(self):
+        return self._capacity
+
+    def claimed_quantity(self):
+        return len(self._holders)
+
+    def available_quantity(self):
+        return self._capacity - len(self._holders)
+
+    def requesters(self):
+        return ()
+
+    def utilization(self):
+        return len(self._holders) / self._capacity if self._capacity > 0 else 0
+
+    def holds(self, holder):
+        return holder in self._holders
+
+    def claim(self, holder):
+        """Gives holder a seat; returns False (and changes nothing) when the pool is full."""
+        if holder in self._holders: return True
+        if len(self._holders) >= self._capacity: return False
+        self._holders.add(holder); return True
+
+    def release(self, holder):
+        self._holders.discard(holder)
+
+    def clear(self):
+        self._holders.clear()
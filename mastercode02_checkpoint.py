@@ -0,0 +1,149 @@
+# mastercode02_checkpoint.py
+# Snapshot the complete agent-engine world at a year boundary and fork scenario branches from it,
+# so sweeps over late-onset events don't recompute the shared prefix for every variant.
+#
+#     snapshot = run_to_checkpoint(20, seed=123)
+#     save_checkpoint(snapshot, 'year20.pkl')
+#     results = fork_scenarios('year20.pkl', [panic_events, health_events], duration=50)
+#
+# A snapshot is plain picklable data, not salabim objects: restoring rebuilds every Person,
+# household, resource claim and manager in a fresh environment at the snapshot year. Branches
+# are statistically equivalent to an uninterrupted run, not bit-identical, because
+# same-time components are scheduled in a different order after the rebuild.
+import contextlib, copy, os, pickle, random, tempfile
+import numpy as np
+import pandas as pd
+import salabim as sim
+from mastercode02_config_and_rates import SIMULATION_DURATION
+from mastercode02_agents import Person, ScenarioManager, EconomicManager, WorldManager
+from mastercode02_logging import LOG_DATA, index_marriages, reset_log_data, open_log_sink, write_and_close_csv_logs
+from mastercode02_household import Household
+from mastercode02_setup import create_capacity_pools
+from mastercode02_runner import build_simulation, start_managers, run_until
+from mastercode02_replications import REPLICATION_TABLES, process_pool
+import mastercode02_globals as g
+import mastercode02_rng
+
+PERSON_STATE = ['id', 'age', 'sex', 'education', 'employment_status', 'employer', 'household_id', 'marital_status',
+                'year_in_level', 'skill_level', 'annual_income', 'gov_support_cum', 'cars', 'use_bus', 'accident_involvement',
+                'commute_purpose', 'layoff_status', 'is_in_jc_school', 'years_married',
+                'start_age_nursery', 'start_age_elementary', 'start_age_middle', 'start_age_high_school',
+                'start_age_college', 'start_age_masters', 'start_age_phd']
+CONTAINER_STATE = ['MARRIAGES', 'VEHICLE_EVENTS', 'TRIP_SUMMARY', 'RATES_LOG', 'ANNUAL_SUMMARY_DATA', 'annual_education_stats', 'labour_market_stats']
+ENV_STATE = ['tax_rate', 'salary_inflation', 'cpi_inflation', 'mortgage_rate', 'bus_fleet_size', 'total_bus_capacity',
+             'bus_passengers_served', 'bus_passengers_refused']
+
+def take_checkpoint(env, components):
+    """Captures the world after all of this year's events have run (call between env.run() calls).
+
+    Employer and school seats are not stored separately: a person holds an employer claim exactly
+    when ``employer`` is set, and a school claim exactly when ``is_in_jc_school`` is True.
+    """
+    return {
+        'year': int(env.now()),
+        'people': [{attr: copy.deepcopy(getattr(p, attr)) for attr in PERSON_STATE} for p in g.POPULATION],
+        'households': [{**{k: v for k, v in hh.items() if k != 'members'}, 'members': [p.id for p in hh['members']]} for hh in g.HOUSEHOLDS.values()],
+        'globals': {name: copy.deepcopy(getattr(g, name)) for name in g.SCALAR_STATE},
+        'containers': {name: copy.deepcopy(getattr(g, name)) for name in CONTAINER_STATE},
+        'vehicles': g.VEHICLES.get_state(), 'rates': copy.deepcopy(g.RATES),
+        'env': {name: getattr(env, name) for name in ENV_STATE if hasattr(env, name)},
+        'forecasts': {name: copy.deepcopy(components[name].forecasts) for name in ['WorldManager', 'EconomicManager']},
+        'reporter_last_year_pop': components['YearlyReporter'].last_year_pop,
+        'log_data': copy.deepcopy(LOG_DATA),
+        'random_state': random.getstate(), 'numpy_random_state': np.random.get_state(), 'rng_streams': mastercode02_rng.get_state(),
+    }
+
+def save_checkpoint(snapshot, path):
+    with open(path, 'wb') as f: pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+def load_checkpoint(path):
+    with open(path, 'rb') as f: return pickle.load(f)
+
+def run_to_checkpoint(year, events=(), seed=123, multiplier=1.0, quiet=False, hazards=False, crn=False):
+    """Runs the shared prefix (with only the events that apply before the fork) up to ``year`` and snapshots it."""
+    with contextlib.ExitStack() as stack:
+        if quiet: stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, 'w'))))
+        env, components = build_simulation([dict(evt) for evt in events], seed, SIMULATION_DURATION, multiplier, hazards=hazards, crn=crn)
+        env.run(till=year)
+        return take_checkpoint(env, components)
+
+def restore_checkpoint(snapshot, events=(), duration=SIMULATION_DURATION, base_filename=None, seed=None):
+    """Rebuilds the world from a snapshot in a fresh environment at the snapshot year.
+
+    Returns (env, components by class name). With ``seed=None`` the branch continues from the
+    snapshot's RNG states, so every branch shares the same random stream; otherwise it is reseeded.
+    """
+    g.reset(); reset_log_data()
+    env = sim.Environment(time_unit='years', random_seed='', trace=False)
+    env.run(till=snapshot['year'])
+    g.RATES = copy.deepcopy(snapshot['rates']); env.RATES = g.RATES
+    g.VEHICLES.set_state(snapshot['vehicles'])
+    create_capacity_pools()
+
+    people = {}
+    for state in snapshot['people']:
+        initial_data = {'id': state['id'], 'age': state['age'], 'sex': state['sex'], 'education': state['education'], 'employment': state['employment_status'], 'household_id': state['household_id'], 'marital_status': state['marital_status']}
+        person = Person(env, initial_data, g.POPULATION)
+        for attr in PERSON_STATE: setattr(person, attr, copy.deepcopy(state[attr]))
+        people[person.id] = person
+    for hh in snapshot['households']:
+        g.HOUSEHOLDS[hh['id']] = Household(members=[people[pid] for pid in hh['members']], **copy.deepcopy({k: v for k, v in hh.items() if k != 'members'}))
+
+    # Persons are activated before the managers so they keep running first within each year (see start_managers).
+    for person in people.values(): person.activate(process='process', resume=True)
+    components = {type(c).__name__: c for c in [ScenarioManager(env=env, events=[dict(evt) for evt in events]), EconomicManager(env=env), WorldManager(env=env)]}
+    for name, forecasts in snapshot['forecasts'].items(): components[name].forecasts = copy.deepcopy(forecasts)
+    components.update(start_managers(env, base_filename, duration, last_year_pop=snapshot['reporter_last_year_pop'],
+                                     hazards=snapshot['globals'].get('HAZARD_SCHEDULING', False)))
+
+    # Manager constructors touch modifiers, env rates and the RNGs, so the saved values are applied last.
+    for name, value in snapshot['env'].items(): setattr(env, name, value)
+    for name, value in snapshot['globals'].items(): setattr(g, name, copy.deepcopy(value))
+    for name, value in snapshot['containers'].items():
+        container = getattr(g, name); container.clear()
+        container.update(copy.deepcopy(value)) if isinstance(container, dict) else container.extend(copy.deepcopy(value))
+    for name, rows in copy.deepcopy(snapshot['log_data']).items(): LOG_DATA[name].extend(rows)
+    index_marriages(LOG_DATA['marriage_summary'])
+    if seed is None:
+        random.setstate(snapshot['random_state']); np.random.set_state(snapshot['numpy_random_state'])
+        mastercode02_rng.set_state(snapshot.get('rng_streams'))
+    else:
+        random.seed(seed); np.random.seed(seed)
+        mastercode02_rng.configure(seed if snapshot.get('rng_streams') else None)
+    return env, components
+
+def run_from_checkpoint(snapshot, events=(), duration=SIMULATION_DURATION, seed=None, base_filename=None, quiet=False, log_format=None):
+    """Runs one scenario branch from a snapshot (a dict or a path) to ``duration`` and returns LOG_DATA.
+
+    ``log_format`` streams the branch's logs (prefix rows included) as in run_simulation.
+    """
+    if isinstance(snapshot, str): snapshot = load_checkpoint(snapshot)
+    with contextlib.ExitStack() as stack:
+        if quiet: stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, 'w'))))
+        env = None
+        try:
+            env, _ = restore_checkpoint(snapshot, events, duration, base_filename, seed)
+            if base_filename and log_format: open_log_sink(base_filename, log_format)
+            run_until(env, duration, events)
+        finally:
+            if base_filename and env is not None: write_and_close_csv_logs(base_filename, env)
+    return LOG_DATA
+
+def _run_branch(path, events, duration, seed):
+    log_data = run_from_checkpoint(path, events, duration, seed, quiet=True)
+    return {name: pd.DataFrame(log_data[name]) for name in REPLICATION_TABLES}
+
+def fork_scenarios(snapshot, scenarios, duration=SIMULATION_DURATION, seeds=None, processes=None):
+    """Runs every scenario (a list of event dicts) as a branch of one snapshot across a process pool.
+
+    ``snapshot`` may be a dict or a path written by save_checkpoint; workers load it from disk.
+    Returns a list with one {table: DataFrame} per scenario, in input order.
+    """
+    with contextlib.ExitStack() as stack:
+        path = snapshot
+        if not isinstance(snapshot, str):
+            tmp_dir = stack.enter_context(tempfile.TemporaryDirectory())
+            path = os.path.join(tmp_dir, 'checkpoint.pkl'); save_checkpoint(snapshot, path)
+        seeds = list(seeds) if seeds is not None else [None] * len(scenarios)
+        with process_pool(processes, len(scenarios)) as pool:
+            return list(pool.map(_run_branch, [path] * len(scenarios), [list(s) for s in scenarios], [duration] * len(scenarios), seeds))
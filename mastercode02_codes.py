@@ -0,0 +1,46 @@
+# mastercode02_codes.py
+import numpy as np
+from mastercode02_config_and_rates import EMPLOYERS, INCOME_BANDS
+
+# --- Small-int codes for categorical person attributes ---
+SEXES = ['Male', 'Female']
+EDUCATION_LEVELS = ['too_young', 'Nursery/Preschool', 'Elementary (K-5)', 'Middle (6-8)', 'High School (9-12)', 'University',
+                    'masters_program', 'phd_program', 'high_school_completed', 'high_school_dropout', 'college_dropout',
+                    'college_completed', 'masters_completed', 'masters_dropout', 'phd_completed']
+EMPLOYMENT_STATUSES = ['Too Young', 'Employed', 'Unemployed', 'Not in Labor Force', 'Retired']
+MARITAL_STATUSES = ['Never married', 'Now married (except separated)', 'Widowed', 'Divorced', 'Separated', 'Married', 'Single']
+EMPLOYER_IDS = list(EMPLOYERS.keys())
+NO_EMPLOYER = -1
+
+SEX_CODE = {name: i for i, name in enumerate(SEXES)}
+EDUCATION_CODE = {name: i for i, name in enumerate(EDUCATION_LEVELS)}
+EMPLOYMENT_CODE = {name: i for i, name in enumerate(EMPLOYMENT_STATUSES)}
+MARITAL_CODE = {name: i for i, name in enumerate(MARITAL_STATUSES)}
+EMPLOYER_CODE = {emp_id: i for i, emp_id in enumerate(EMPLOYER_IDS)}
+
+# Persons count as married for fertility exactly when the status string contains 'Married' (see Person.process).
+MARRIED_CODES = np.array(['Married' in s for s in MARITAL_STATUSES])
+
+# --- Five-year age groups used by RATES ---
+AGE_GROUPS = ['0-4', '5-9', '10-14', '15-19', '20-24', '25-29', '30-34', '35-39', '40-44', '45-49', '50-54', '55-59', '60-64', '65-69', '70-74', '75-79', '80-84', '85+']
+
+def age_group_index(ages):
+    """Vectorized equivalent of Person.get_age_group, returning indices into AGE_GROUPS."""
+    return np.minimum(np.asarray(ages) // 5, len(AGE_GROUPS) - 1)
+
+def rate_table(rates_by_group):
+    """Turns a {'0-4': rate, ...} mapping into an array indexed by age_group_index (missing groups are 0)."""
+    return np.array([rates_by_group.get(group, 0) for group in AGE_GROUPS], dtype=float)
+
+def skill_index(education_codes):
+    """Vectorized equivalent of the skill ladder in Person._assign_skill_and_income."""
+    education_codes = np.asarray(education_codes)
+    skill = np.zeros(education_codes.shape, dtype=np.int8)
+    skill[np.isin(education_codes, [EDUCATION_CODE['high_school_completed'], EDUCATION_CODE['college_dropout']])] = 1
+    skill[education_codes == EDUCATION_CODE['college_completed']] = 2
+    skill[np.isin(education_codes, [EDUCATION_CODE['masters_completed'], EDUCATION_CODE['phd_completed']])] = 3
+    return skill
+
+# INCOME_BAND_LOW/HIGH[employer_code, skill_index]
+INCOME_BAND_LOW = np.array([[band[0] for band in INCOME_BANDS[EMPLOYERS[emp_id]['name']]] for emp_id in EMPLOYER_IDS], dtype=float)
+INCOME_BAND_HIGH = np.array([[band[1] for band in INCOME_BANDS[EMPLOYERS[emp_id]['name']]] for emp_id in EMPLOYER_IDS], dtype=float)
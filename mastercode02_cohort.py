@@ -0,0 +1,327 @@
+# mastercode02_cohort.py
+# Opt-in "array engine": person state lives in NumPy columns and the yearly Person steps
+# (death, ageing, education, employment, births, income, cars) run as batched array operations
+# inside one salabim component, instead of one Person process per agent. The same component then
+# does the STAGE 2 managers' yearly work (commute, marriage, traffic, government support, household
+# finance, school seats, immigration) on the table and on g.HOUSEHOLDS.
+import salabim as sim
+import numpy as np
+from collections import namedtuple
+from mastercode02_config_and_rates import EMPLOYERS, EMPLOYER_PROBS, EDUCATION_CAPACITIES, CAR_AFFORDABILITY, IMMIGRATION_CONFIG, COMMUTATION_PURPOSES
+from mastercode02_codes import (SEX_CODE, EDUCATION_LEVELS, EDUCATION_CODE, EMPLOYMENT_CODE, MARITAL_CODE, EMPLOYER_IDS, NO_EMPLOYER,
+                                MARRIED_CODES, INCOME_BAND_LOW, INCOME_BAND_HIGH, age_group_index, rate_table, skill_index)
+from mastercode02_generator import assign_households
+import mastercode02_globals as g
+from mastercode02_rng import stream, agent_uniforms
+from mastercode02_logging import log_cohort_yearly_data
+from mastercode02_labour import match_jobs, record_labour_market
+from mastercode02_profile import touched
+from mastercode02_household import Household
+from mastercode02_marriage_market import MarriageMarket
+from mastercode02_snapshot import BUS_PURPOSES, sample_trip_purposes, count_trips
+from mastercode02_vehicles import PURCHASE, INHERITANCE, RETIRED_AGE, RETIRED_NO_HEIR, NO_OWNER
+from mastercode02_agents import (settle_household_finances, disburse_gov_support, road_accident_probability,
+                                 update_bus_fleet, serve_bus_demand)
+
+COLUMNS = {
+    'id': np.int64, 'age': np.int16, 'sex': np.int8, 'education': np.int8, 'year_in_level': np.int16,
+    'start_age_nursery': np.int8, 'employment': np.int8, 'employer': np.int8, 'household': np.int64,
+    'income': np.float64, 'cars': np.int16, 'marital_status': np.int8, 'years_married': np.int16, 'layoff': np.bool_,
+}
+
+# Offsets of each later school start age from start_age_nursery (see Person.__init__).
+START_OFFSETS = {'Nursery/Preschool': 0, 'Elementary (K-5)': 2, 'Middle (6-8)': 7, 'High School (9-12)': 10, 'University': 14, 'masters_program': 18, 'phd_program': 20}
+IN_SCHOOL = [EDUCATION_CODE[level] for level in ['Nursery/Preschool', 'Elementary (K-5)', 'Middle (6-8)', 'High School (9-12)', 'University', 'masters_program', 'phd_program']]
+NOT_IN_LABOR_FORCE = [EMPLOYMENT_CODE['Too Young'], EMPLOYMENT_CODE['Retired']]
+STUDENT_CODES = [i for i, level in enumerate(EDUCATION_LEVELS) if 'University' in level or 'program' in level]  # see household.is_student
+BUS_PURPOSE_CODES = [COMMUTATION_PURPOSES.index(purpose) for purpose in BUS_PURPOSES]
+
+# A never-married woman on this year's MarriageMarket (which only reads id and age).
+Single = namedtuple('Single', ['id', 'age', 'row'])
+
+class PersonTable:
+    """Columnar person store: one NumPy array per attribute, all the same length."""
+    def __init__(self, **columns):
+        n = len(columns['id']) if columns else 0
+        for name, dtype in COLUMNS.items():
+            setattr(self, name, np.asarray(columns[name], dtype=dtype) if name in columns else np.zeros(n, dtype=dtype))
+
+    def __len__(self):
+        return len(self.id)
+
+    def append(self, other):
+        for name in COLUMNS: setattr(self, name, np.concatenate([getattr(self, name), getattr(other, name)]))
+
+    def keep(self, mask):
+        for name in COLUMNS: setattr(self, name, getattr(self, name)[mask])
+
+def build_person_table(population, households, rng):
+    """Builds a PersonTable from a generate_population_table() table, mirroring Initializer.process."""
+    n = len(population['age']); hh_ids = np.fromiter(households, dtype=np.int64, count=len(households))
+    placement = assign_households(population['age'], population['sex'] == SEX_CODE['Male'],
+                                  population['marital_status'] == MARITAL_CODE['Now married (except separated)'],
+                                  [households[hh_id]['type'] for hh_id in hh_ids.tolist()], rng) if len(hh_ids) else None
+    table = PersonTable(
+        id=np.arange(g._person_id_counter + 1, g._person_id_counter + 1 + n),
+        age=population['age'], sex=population['sex'], education=population['education'],
+        employment=population['employment'], marital_status=population['marital_status'],
+        start_age_nursery=rng.choice([2, 3], size=n), employer=np.full(n, NO_EMPLOYER), years_married=np.full(n, -1),
+        household=hh_ids[placement] if placement is not None else np.full(n, -1),
+    )
+    g._person_id_counter += n
+    for level, offset in START_OFFSETS.items():
+        in_level = table.education == EDUCATION_CODE[level]
+        table.year_in_level[in_level] = np.maximum(1, table.age[in_level] - (table.start_age_nursery[in_level] + offset) + 1)
+    employed = np.flatnonzero(table.employment == EMPLOYMENT_CODE['Employed'])
+    table.employer[employed] = rng.choice(len(EMPLOYER_IDS), size=len(employed), p=np.asarray(EMPLOYER_PROBS) / sum(EMPLOYER_PROBS))
+    _assign_skill_and_income(table, employed, rng)
+    return table
+
+def _assign_skill_and_income(table, idx, rng):
+    skill = skill_index(table.education[idx]); employer = table.employer[idx]
+    table.income[idx] = rng.uniform(INCOME_BAND_LOW[employer, skill], INCOME_BAND_HIGH[employer, skill]) * g.event_income_modifier
+
+class CohortEngine(sim.Component):
+    """Runs the yearly Person steps for every row of a PersonTable at once, then the STAGE 2 managers' work in
+    the order start_managers creates them (see _stage2).
+
+    Cars live in g.VEHICLES like in the agent engine (owners are person ids). Households are the g.HOUSEHOLDS
+    records without member objects: each year their member aggregates are written from the table, so the
+    government and household finance passes of mastercode02_agents run on them unchanged.
+    Set ``log=True`` to log every year like the YearlyReporter does (see log_cohort_yearly_data).
+    """
+    def setup(self, table, seed=None, log=False):
+        self.table = table; self.log = log
+        self.rng = np.random.default_rng(stream('setup').getrandbits(64) if seed is None else seed)
+        self.capacity = np.array([EMPLOYERS[emp_id]['capacity'] for emp_id in EMPLOYER_IDS])
+        self.births = 0; self.deaths = 0; self.last_year_pop = 0
+
+    def process(self):
+        # Like the YearlyReporter, year 0 is logged after its deaths with a growth of 0, and becomes the base for year 1.
+        self._deaths(); self.last_year_pop = len(self.table)
+        if self.log: log_cohort_yearly_data(0, self.env, self, 0.0)
+        while True:
+            yield self.hold(1)
+            self.births = 0; self.deaths = 0
+            t = self.table; touched(len(t))
+            t.age += 1
+            t.years_married[t.years_married >= 0] += 1
+            self._education()
+            self._employment()
+            self._births()
+            t.income[t.income > 0] *= (1 + self.env.salary_inflation)
+            self._cars()
+            self._deaths()
+            self._stage2()
+            if self.log: self._log_year()
+
+    def _deaths(self):
+        t = self.table; rates = self.env.RATES['Death Rates']
+        death_table = np.stack([rate_table(rates['Male']), rate_table(rates['Female'])])
+        death_prob = death_table[t.sex, age_group_index(t.age)] * g.arima_death_rate_modifier * g.event_death_rate_modifier
+        dies = agent_uniforms('mortality', t.id, int(self.env.now()), self.rng) < death_prob
+        self.deaths += int(dies.sum()); self._bequeath_cars(dies); t.keep(~dies)
+
+    def _bequeath_cars(self, dies):
+        """Person.die for the cars of this year's dead: the oldest surviving adult of the household inherits them, else they retire."""
+        t = self.table; v = g.VEHICLES; year = int(self.env.now())
+        if not (dies & (t.cars > 0)).any(): return
+        cars = v.in_use(); owners = np.searchsorted(t.id, v.owner[cars]); left = dies[owners]
+        cars = cars[left]; owners = owners[left]; hh = t.household[owners]
+        adults = np.flatnonzero(~dies & (t.age >= 18)); adults = adults[np.lexsort((-t.age[adults], t.household[adults]))]
+        heir_hh, first = np.unique(t.household[adults], return_index=True)
+        pos = np.minimum(np.searchsorted(heir_hh, hh), max(len(heir_hh) - 1, 0))
+        has_heir = heir_hh[pos] == hh if len(heir_hh) else np.zeros(len(hh), dtype=bool)
+        heirs = adults[first][pos[has_heir]]
+        v.owner[cars[has_heir]] = t.id[heirs]; np.add.at(t.cars, heirs, 1); v.owner[cars[~has_heir]] = NO_OWNER
+        g.VEHICLE_EVENTS.extend((year, INHERITANCE, car, owner, heir) for car, owner, heir in zip(cars[has_heir].tolist(), t.id[owners[has_heir]].tolist(), t.id[heirs].tolist()))
+        g.VEHICLE_EVENTS.extend((year, RETIRED_NO_HEIR, car, owner, None) for car, owner in zip(cars[~has_heir].tolist(), t.id[owners[~has_heir]].tolist()))
+
+    def _education(self):
+        t = self.table; rng = self.rng; edu = t.education.copy(); n = len(t)
+        hs, uni = EDUCATION_CODE['High School (9-12)'], EDUCATION_CODE['University']
+        dropout = np.isin(edu, [hs, uni]) & (rng.random(n) < g.event_dropout_prob)
+        t.education[dropout & (edu == hs)] = EDUCATION_CODE['high_school_dropout']
+        t.education[dropout & (edu == uni)] = EDUCATION_CODE['college_dropout']
+        t.year_in_level[dropout] = 0
+        active = ~dropout
+        t.year_in_level[active & np.isin(edu, IN_SCHOOL)] += 1
+        yil = t.year_in_level.copy(); start = t.start_age_nursery; draw = rng.random(n)
+
+        def move(mask, new_level, yil_value):
+            t.education[mask] = EDUCATION_CODE[new_level]; t.year_in_level[mask] = yil_value
+
+        def finish(level, years, passed, failed, pass_rate):
+            done = active & (edu == EDUCATION_CODE[level]) & (yil > years)
+            move(done & (draw < pass_rate), passed, 0); move(done & (draw >= pass_rate), failed, 0)
+
+        def enrol(completed, program, offset, rate):
+            move(active & (edu == EDUCATION_CODE[completed]) & (t.age >= start + offset) & (draw < rate), program, 1)
+
+        move(active & (edu == EDUCATION_CODE['too_young']) & (t.age == start), 'Nursery/Preschool', 1)
+        move(active & (edu == EDUCATION_CODE['Nursery/Preschool']) & (yil > 2), 'Elementary (K-5)', 1)
+        move(active & (edu == EDUCATION_CODE['Elementary (K-5)']) & (yil > 5), 'Middle (6-8)', 1)
+        move(active & (edu == EDUCATION_CODE['Middle (6-8)']) & (yil > 3), 'High School (9-12)', 1)
+        finish('High School (9-12)', 4, 'high_school_completed', 'high_school_dropout', 0.95)
+        enrol('high_school_completed', 'University', START_OFFSETS['University'], 0.60)
+        finish('University', 4, 'college_completed', 'college_dropout', 0.75)
+        enrol('college_completed', 'masters_program', START_OFFSETS['masters_program'], 0.10)
+        finish('masters_program', 2, 'masters_completed', 'masters_dropout', 0.90)
+        enrol('masters_completed', 'phd_program', START_OFFSETS['phd_program'], 0.05)
+        finish('phd_program', 4, 'phd_completed', 'phd_completed', 1.0)
+
+    def _employment(self):
+        t = self.table; rng = self.rng; n = len(t)
+        employed, unemployed = EMPLOYMENT_CODE['Employed'], EMPLOYMENT_CODE['Unemployed']
+        laid_off = (t.employment == employed) & (rng.random(n) < 0.05); laid_off_employers = t.employer[laid_off & (t.employer >= 0)]
+        t.layoff[laid_off] = True; t.employment[laid_off] = unemployed
+        t.employer[laid_off] = NO_EMPLOYER; t.income[laid_off] = 0
+        seeking = np.isin(t.employment, [EMPLOYMENT_CODE['Not in Labor Force'], unemployed]) & (t.age >= 18) & (t.age < 65)
+        job_chance = rate_table(self.env.RATES['Employment']['Employed'])[age_group_index(t.age)] * g.event_employment_rate_modifier
+        seekers = np.flatnonzero(seeking & (rng.random(n) < job_chance))
+        vacancies = self.capacity - np.bincount(t.employer[t.employer >= 0], minlength=len(self.capacity))
+        assigned, applicants = match_jobs(skill_index(t.education[seekers]), vacancies, rng)
+        hired = seekers[assigned >= 0]
+        t.employment[hired] = employed; t.employer[hired] = assigned[assigned >= 0]
+        _assign_skill_and_income(t, hired, rng)
+        record_labour_market(vacancies, applicants, assigned, laid_off_employers)
+
+    def _births(self):
+        t = self.table; rng = self.rng; rates = self.env.RATES['Fertility Rate']
+        fertile = np.flatnonzero((t.sex == SEX_CODE['Female']) & (t.age >= 15) & (t.age < 50))
+        groups = age_group_index(t.age[fertile])
+        prob = np.where(MARRIED_CODES[t.marital_status[fertile]], rate_table(rates['Married'])[groups], rate_table(rates['Unmarried'])[groups])
+        prob = prob * g.arima_birth_rate_modifier * g.event_birth_rate_modifier
+        ym = t.years_married[fertile]; prob[(ym >= 0) & (ym <= 10)] *= 1.5
+        mothers = fertile[agent_uniforms('fertility', t.id[fertile], int(self.env.now()), rng) < prob]
+        k = len(mothers)
+        if k == 0: return
+        newborns = PersonTable(
+            id=np.arange(g._person_id_counter + 1, g._person_id_counter + 1 + k), sex=rng.integers(2, size=k),
+            education=np.full(k, EDUCATION_CODE['too_young']), employment=np.full(k, EMPLOYMENT_CODE['Too Young']),
+            employer=np.full(k, NO_EMPLOYER), household=t.household[mothers], marital_status=np.full(k, MARITAL_CODE['Never married']),
+            start_age_nursery=rng.choice([2, 3], size=k), years_married=np.full(k, -1),
+        )
+        g._person_id_counter += k; self.births += k; t.append(newborns)
+
+    def _cars(self):
+        """Person._manage_car_lifecycle and _decide_on_car_purchase for every row."""
+        t = self.table; v = g.VEHICLES; year = int(self.env.now())
+        cars = v.in_use(); v.age[cars] += 1; retired = cars[v.age[cars] > 10]; owners = v.owner[retired]
+        np.subtract.at(t.cars, np.searchsorted(t.id, owners), 1); v.owner[retired] = NO_OWNER
+        g.VEHICLE_EVENTS.extend((year, RETIRED_AGE, car, owner, None) for car, owner in zip(retired.tolist(), owners.tolist()))
+        households, rows = self._household_rows()
+        if not households: return
+        total_income = np.array([hh.get('total_income', 0) for hh in households], dtype=float)[rows]
+        prob = np.where(t.employment == EMPLOYMENT_CODE['Employed'], 0.30, 0.10)
+        buyers = np.flatnonzero((t.age >= 18) & (t.cars == 0) & (total_income > CAR_AFFORDABILITY['min_household_income_threshold']) & (self.rng.random(len(t)) < prob))
+        car_ids = v.add_many(t.id[buyers]); t.cars[buyers] += 1
+        g.VEHICLE_EVENTS.extend((year, PURCHASE, car, owner, hh_id) for car, owner, hh_id in zip(car_ids.tolist(), t.id[buyers].tolist(), t.household[buyers].tolist()))
+
+    # --- STAGE 2 managers ---
+    def _stage2(self):
+        self._commute()
+        self._marriages()
+        self._traffic()
+        self._publish_households()
+        disburse_gov_support(g.HOUSEHOLDS.values())
+        settle_household_finances(self.env, g.HOUSEHOLDS.values())
+        self._school_seats()
+        self._immigration()
+
+    def _commute(self):
+        """PopulationSweep's commute purposes (newborns have none yet), then PublicTransitManager and CommuteManager."""
+        t = self.table; stepped = t.age > 0
+        purposes = sample_trip_purposes(t.age[stepped], self.rng); count_trips(purposes)
+        update_bus_fleet(self.env, len(t))
+        serve_bus_demand(self.env, int(((t.cars[stepped] == 0) & np.isin(purposes, BUS_PURPOSE_CODES)).sum()))
+
+    def _marriages(self):
+        """MarriageManager: eligible men propose in random order, each drawing a never-married woman within five
+        years of his age from a MarriageMarket; every couple moves into a new household."""
+        t = self.table; year = int(self.env.now()); single = t.marital_status == MARITAL_CODE['Never married']
+        men = self.rng.permutation(np.flatnonzero(single & (t.sex == SEX_CODE['Male']) & (t.age >= 22))); touched(len(men))
+        men = men[self.rng.random(len(men)) < 0.40 * g.arima_marriage_rate_modifier]
+        if not len(men): return
+        market = MarriageMarket(); women = np.flatnonzero(single & (t.sex == SEX_CODE['Female']) & (t.age >= 17))
+        for row, person_id, age in zip(women.tolist(), t.id[women].tolist(), t.age[women].tolist()): market.add(Single(person_id, age, row), year)
+        husbands = []; wives = []
+        for man in men.tolist():
+            woman = market.draw(int(t.age[man]), year, rng=stream('marriage'))
+            if woman is not None: market.discard(woman); husbands.append(man); wives.append(woman.row)
+        if not husbands: return
+        husbands = np.array(husbands); wives = np.array(wives); new_hh_ids = []
+        for man, woman in zip(husbands.tolist(), wives.tolist()):
+            hh_id = g.next_household_id(); new_hh_ids.append(hh_id)
+            g.HOUSEHOLDS[hh_id] = Household(id=hh_id, type='Married-couple family household', births=0, deaths=0, marriages=1)
+            g.MARRIAGES.append({'marriage_id': f"M_{year}_{g.next_marriage_id()}", 'man_id': int(t.id[man]), 'man_former_hh': int(t.household[man]), 'man_age': int(t.age[man]),
+                                'woman_id': int(t.id[woman]), 'woman_former_hh': int(t.household[woman]), 'woman_age': int(t.age[woman]), 'new_hh_id': hh_id, 'year_of_marriage': year})
+        touched(len(husbands))
+        for rows in (husbands, wives):
+            t.household[rows] = new_hh_ids; t.marital_status[rows] = MARITAL_CODE['Married']; t.years_married[rows] = 0
+
+    def _traffic(self):
+        """TrafficManager: every car is on the road, and each car owner has this year's accident probability."""
+        t = self.table; accident_prob = road_accident_probability(int(t.cars.sum()))
+        g.ANNUAL_SUMMARY_DATA['num_accidents'] = int(self.rng.binomial(int((t.cars > 0).sum()), accident_prob))
+
+    def _household_rows(self):
+        """g.HOUSEHOLDS as a list and each row's index into it (household ids are handed out in increasing order)."""
+        households = list(g.HOUSEHOLDS.values()); hh_ids = np.fromiter(g.HOUSEHOLDS, dtype=np.int64, count=len(households))
+        return households, np.searchsorted(hh_ids, self.table.household)
+
+    def _publish_households(self):
+        """Writes each household's member aggregates, which Person keeps up to date in the agent engine (see Household)."""
+        t = self.table; households, rows = self._household_rows()
+        if not households: return
+        adult = t.age >= 18; employed = t.employment == EMPLOYMENT_CODE['Employed']
+        def total(weights, dtype=np.int64): return np.bincount(rows, weights, minlength=len(households)).astype(dtype).tolist()
+        columns = {'adults': total(adult), 'children': total(~adult), 'working_adults': total(adult & employed), 'employed': total(employed),
+                   'students': total(np.isin(t.education, STUDENT_CODES)), 'income': total(t.income, float), 'cars': total(t.cars)}
+        for name, values in columns.items():
+            for hh, value in zip(households, values): setattr(hh, name, value)
+
+    def _school_seats(self):
+        """EducationManager: every person at a capped school level competes for its seats."""
+        counts = np.bincount(self.table.education, minlength=len(EDUCATION_LEVELS))
+        for level_name, capacity in EDUCATION_CAPACITIES.items():
+            eligible = int(counts[EDUCATION_CODE[level_name]]) if level_name in EDUCATION_CODE else 0; in_use = min(eligible, int(capacity))
+            g.annual_education_stats[level_name] = {'in_use': in_use, 'refused': eligible - in_use}
+
+    def _immigration(self):
+        """ImmigrationManager: arrivals scale with last year's economic index, each into a new nonfamily household."""
+        t = self.table; rng = self.rng
+        k = int(int(len(t) * IMMIGRATION_CONFIG['base_annual_rate']) * max(0, g.latest_economic_index / 50.0)); touched(k)
+        if k <= 0: return
+        print(f"CohortEngine: Adding {k} new agents this year.")
+        hh_ids = [g.next_household_id() for _ in range(k)]
+        for hh_id in hh_ids: g.HOUSEHOLDS[hh_id] = Household(id=hh_id, type='Nonfamily household')
+        levels = [EDUCATION_CODE[level] for level in IMMIGRATION_CONFIG['education_distribution']]
+        weights = np.array(list(IMMIGRATION_CONFIG['education_distribution'].values()), dtype=float); low, high = IMMIGRATION_CONFIG['age_range']
+        newcomers = PersonTable(
+            id=np.arange(g._person_id_counter + 1, g._person_id_counter + 1 + k), age=rng.integers(low, high + 1, size=k), sex=rng.integers(2, size=k),
+            education=np.array(levels)[rng.choice(len(levels), size=k, p=weights / weights.sum())], employment=np.full(k, EMPLOYMENT_CODE['Unemployed']),
+            employer=np.full(k, NO_EMPLOYER), household=hh_ids, marital_status=np.full(k, MARITAL_CODE['Never married']),
+            start_age_nursery=rng.choice([2, 3], size=k), years_married=np.full(k, -1),
+        )
+        g._person_id_counter += k; t.append(newcomers)
+
+    def aggregates(self):
+        """The population-level numbers the agent managers and log_yearly_data compute from g.POPULATION."""
+        t = self.table
+        employed = int((t.employment == EMPLOYMENT_CODE['Employed']).sum())
+        labor_force = int((~np.isin(t.employment, NOT_IN_LABOR_FORCE)).sum())
+        incomes = t.income[t.income > 0]
+        return {
+            'population': len(t), 'births': self.births, 'deaths': self.deaths,
+            'employed': employed, 'labor_force': labor_force, 'avg_income': float(incomes.mean()) if len(incomes) else 0.0,
+            'total_cars': int(t.cars.sum()), 'high_risk_drivers': int(((t.cars > 0) & (t.age >= 16) & (t.age <= 21)).sum()),
+            'old_vehicles': int((g.VEHICLES.age[g.VEHICLES.in_use()] >= 8).sum()),
+            'employer_in_use': dict(zip(EMPLOYER_IDS, np.bincount(t.employer[t.employer >= 0], minlength=len(EMPLOYER_IDS)).tolist())),
+        }
+
+    def _log_year(self):
+        current_pop = len(self.table)
+        growth_rate = (current_pop - self.last_year_pop) / self.last_year_pop if self.last_year_pop > 0 else 0
+        self.last_year_pop = current_pop
+        log_cohort_yearly_data(int(self.env.now()), self.env, self, growth_rate)
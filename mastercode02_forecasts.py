@@ -0,0 +1,53 @@
+# mastercode02_forecasts.py
+import warnings
+import numpy as np
+from mastercode02_config_and_rates import SIMULATION_DURATION, HISTORICAL_MACRO_DATA, HISTORICAL_ECONOMIC_DATA
+from mastercode02_cache import cache_key, load_arrays, save_arrays
+
+ARIMA_ORDER = (1, 1, 1)
+# Series forecast by WorldManager and EconomicManager, in the column order of a macro path (see sample_macro_paths).
+MACRO_SERIES = ['Mortality Rate', 'Birth Rate', 'Employment Rate']
+ECONOMIC_SERIES = ['Top Tax Rate', 'Salary Inflation', 'Cost Inflation (CPI)', '30-Yr Mortgage']
+PATH_SERIES = MACRO_SERIES + ECONOMIC_SERIES
+PATH_COLUMN = {name: i for i, name in enumerate(PATH_SERIES)}
+
+def load_forecasts(historical_data, columns, order=ARIMA_ORDER, steps=SIMULATION_DURATION + 1):
+    """Returns {column: {'mean': ndarray, 'stderr': ndarray}} of ARIMA forecasts for each column.
+
+    Results are cached on disk keyed by the historical series, the model order and the number of
+    steps; on a cache hit statsmodels is never imported.
+    """
+    series = {'Year': list(historical_data['Year']), **{c: list(historical_data[c]) for c in columns}}
+    key = cache_key('arima', series, list(order), steps)
+    cached = load_arrays('arima', key)
+    if cached is not None and all(f"mean_{i}" in cached for i in range(len(columns))):
+        return {c: {'mean': cached[f"mean_{i}"], 'stderr': cached[f"stderr_{i}"]} for i, c in enumerate(columns)}
+
+    import pandas as pd
+    from statsmodels.tsa.arima.model import ARIMA
+    df = pd.DataFrame(historical_data); df.set_index('Year', inplace=True)
+    forecasts = {}
+    for column in columns:
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore'); model = ARIMA(df[column], order=order).fit()
+            pred = model.get_forecast(steps=steps)
+            forecasts[column] = {'mean': np.asarray(pred.predicted_mean, dtype=float), 'stderr': np.asarray(pred.se_mean, dtype=float)}
+        except Exception as e: print(f"ARIMA training failed for {column}: {e}")
+    if len(forecasts) == len(columns):
+        arrays = {}
+        for i, c in enumerate(columns): arrays[f"mean_{i}"] = forecasts[c]['mean']; arrays[f"stderr_{i}"] = forecasts[c]['stderr']
+        save_arrays('arima', key, arrays)
+    return forecasts
+
+def sample_macro_paths(replications, rng=None):
+    """Draws every stochastic forecast for a batch of runs up front: a (replications x years x PATH_SERIES) array.
+
+    Each value is Normal(forecast mean, forecast stderr) for that year, as WorldManager and EconomicManager draw
+    them one by one; ``rng`` is a seed or a np.random.Generator. Pass row i to run i as ``macro_path``, and save
+    the array with np.save to reuse the exact paths later.
+    """
+    if not isinstance(rng, np.random.Generator): rng = np.random.default_rng(rng)
+    forecasts = {**load_forecasts(HISTORICAL_MACRO_DATA, MACRO_SERIES), **load_forecasts(HISTORICAL_ECONOMIC_DATA, ECONOMIC_SERIES)}
+    mean = np.stack([forecasts[name]['mean'] for name in PATH_SERIES], axis=1); stderr = np.stack([forecasts[name]['stderr'] for name in PATH_SERIES], axis=1)
+    return mean + stderr * rng.standard_normal((replications,) + mean.shape)
@@ -1,6 +1,9 @@
 # mastercode02_generator.py
 import random
 import re
+import numpy as np
+from mastercode02_codes import SEX_CODE, EDUCATION_CODE, EMPLOYMENT_CODE, MARITAL_CODE, SEXES, EDUCATION_LEVELS, EMPLOYMENT_STATUSES, MARITAL_STATUSES
+from mastercode02_cache import cache_key, load_arrays, save_arrays
 
 DATA = {
     'demographics': {
@@ -45,17 +48,128 @@ def assign_employment(age):
     if rand_val < lfp_rate: return "Employed"
     return "Not in Labor Force"
 
+def age_band(age_group_str):
+    """(min_age, max_age) for a DATA['demographics'] label, parsed once per group."""
+    age_nums = [int(s) for s in re.findall(r'\d+', age_group_str)]
+    return (0, 4) if 'Under' in age_group_str else (85, 95) if 'over' in age_group_str else (age_nums[0], age_nums[1])
+
 def generate_initial_population():
     print("--- Starting Programmatic Population Generation ---")
     generated_agents = []
     for sex, age_groups in DATA['demographics'].items():
         for age_group_str, count in age_groups.items():
-            age_nums = [int(s) for s in re.findall(r'\d+', age_group_str)]
-            min_age, max_age = (0, 4) if 'Under' in age_group_str else (85, 95) if 'over' in age_group_str else (age_nums[0], age_nums[1])
+            min_age, max_age = age_band(age_group_str)
             for _ in range(count):
                 age = random.randint(min_age, max_age)
                 education = assign_education(age)
                 employment = assign_employment(age)
                 generated_agents.append(TempPerson(age=age, sex=sex, education=education, marital_status=assign_marital_status(age, sex), employment=employment))
     print(f"SUCCESS: Generated exactly {len(generated_agents)} temporary agent data objects.")
-    return generated_agents
\ No newline at end of file
+    return generated_agents
+
+# --- Vectorized, cacheable generator ---
+POPULATION_COLUMNS = ['age', 'sex', 'education', 'marital_status', 'employment']
+ADULT_EDUCATION = ['high_school_completed', 'college_dropout', 'college_completed', 'masters_completed']
+ADULT_EDUCATION_WEIGHTS = [35, 25, 30, 10]
+MARITAL_AGE_KEYS = [(15, '15-19'), (20, '20-34'), (35, '35-44'), (45, '45-54'), (55, '55-64'), (65, '65+')]
+EMPLOYMENT_AGE_KEYS = [(16, '16-19'), (20, '20-24'), (25, '25-29'), (30, '30-34'), (35, '35-44'), (45, '45-54'), (55, '55-59'), (60, '60-64'), (65, '65-74'), (75, '75+')]
+
+def _age_key_index(ages, keys):
+    return np.searchsorted([lo for lo, _ in keys], ages, side='right') - 1
+
+def _sample_education(ages, rng):
+    education = np.select([ages < 3, ages < 5, ages < 10, ages < 14, ages < 18, ages < 22],
+                          [EDUCATION_CODE[level] for level in ['too_young', 'Nursery/Preschool', 'Elementary (K-5)', 'Middle (6-8)', 'High School (9-12)', 'University']],
+                          default=-1).astype(np.int8)
+    adults = education == -1
+    weights = np.asarray(ADULT_EDUCATION_WEIGHTS, dtype=float)
+    education[adults] = np.asarray([EDUCATION_CODE[e] for e in ADULT_EDUCATION], dtype=np.int8)[rng.choice(len(weights), size=adults.sum(), p=weights / weights.sum())]
+    return education
+
+def _sample_employment(ages, rng):
+    employment = np.full(len(ages), EMPLOYMENT_CODE['Too Young'], dtype=np.int8)
+    key_idx = _age_key_index(ages, EMPLOYMENT_AGE_KEYS); rand_val = rng.random(len(ages))
+    emp_ratio = np.array([DATA['employment'][key]['emp_ratio'] for _, key in EMPLOYMENT_AGE_KEYS])
+    unemp_rate = np.array([DATA['employment'][key]['unemp_rate'] for _, key in EMPLOYMENT_AGE_KEYS])
+    lfp_rate = np.divide(emp_ratio, 1 - unemp_rate, out=emp_ratio.copy(), where=(1 - unemp_rate) > 0)
+    working_age = (ages >= 16) & (ages < 65); older = ages >= 65
+    r, k = rand_val[working_age], key_idx[working_age]
+    employment[working_age] = np.select([r < unemp_rate[k], r < lfp_rate[k]], [EMPLOYMENT_CODE['Unemployed'], EMPLOYMENT_CODE['Employed']], EMPLOYMENT_CODE['Not in Labor Force'])
+    employment[older] = np.where(rand_val[older] < emp_ratio[key_idx[older]], EMPLOYMENT_CODE['Employed'], EMPLOYMENT_CODE['Retired'])
+    return employment
+
+def _sample_marital_status(ages, sex, rng):
+    status = np.full(len(ages), MARITAL_CODE['Never married'], dtype=np.int8)
+    key_idx = _age_key_index(ages, MARITAL_AGE_KEYS)
+    for k, (_, age_key) in enumerate(MARITAL_AGE_KEYS):
+        dist = DATA['marital_status'][sex][age_key]; members = np.flatnonzero(key_idx == k)
+        probs = np.asarray(list(dist.values()), dtype=float)
+        status[members] = np.asarray([MARITAL_CODE[m] for m in dist], dtype=np.int8)[rng.choice(len(probs), size=len(members), p=probs / probs.sum())]
+    return status
+
+def generate_population_table(seed=None, multiplier=1.0, use_cache=True):
+    """NumPy counterpart of generate_initial_population, returning columns instead of TempPerson objects.
+
+    Columns are int16 ages plus int8 codes from mastercode02_codes (decode with population_labels).
+    Each (sex, age band) count in DATA['demographics'] is scaled by ``multiplier`` for what-if cities.
+    With a seed, the table is cached on disk keyed by DATA, the seed and the multiplier.
+    """
+    key = cache_key('population', DATA, seed, multiplier) if seed is not None and use_cache else None
+    if key:
+        cached = load_arrays('population', key)
+        if cached is not None:
+            print(f"--- Loaded cached population ({len(cached['age'])} agents) ---")
+            return cached
+    print("--- Starting Vectorized Population Generation ---")
+    rng = np.random.default_rng(seed); columns = {name: [] for name in POPULATION_COLUMNS}
+    for sex, age_groups in DATA['demographics'].items():
+        bands = [age_band(label) + (int(round(count * multiplier)),) for label, count in age_groups.items()]
+        ages = np.concatenate([rng.integers(lo, hi + 1, size=n, dtype=np.int16) for lo, hi, n in bands] or [np.zeros(0, dtype=np.int16)])
+        columns['age'].append(ages); columns['sex'].append(np.full(len(ages), SEX_CODE[sex], dtype=np.int8))
+        columns['education'].append(_sample_education(ages, rng)); columns['employment'].append(_sample_employment(ages, rng))
+        columns['marital_status'].append(_sample_marital_status(ages, sex, rng))
+    table = {name: np.concatenate(parts) for name, parts in columns.items()}
+    print(f"SUCCESS: Generated {len(table['age'])} agents as columns.")
+    if key: save_arrays('population', key, table)
+    return table
+
+def population_labels(table, column):
+    """Decodes one coded column of a population table back into its string labels."""
+    labels = {'sex': SEXES, 'education': EDUCATION_LEVELS, 'employment': EMPLOYMENT_STATUSES, 'marital_status': MARITAL_STATUSES}[column]
+    return [labels[code] for code in table[column].tolist()]
+
+FAMILY_HOUSEHOLDS = ['Married-couple family household', 'Male householder, no spouse present, family household', 'Female householder, no spouse present, family household']
+
+def assign_households(ages, is_male, is_married, household_types, rng):
+    """Places everyone in one vectorized pass and returns, per person, an index into household_types.
+
+    Married-couple households get a male and a female adult (currently-married adults first),
+    single-householder families get an adult of the matching sex, nonfamily households get one adult.
+    Children then go to family households and the remaining adults are spread over all households.
+    """
+    ages = np.asarray(ages); is_male = np.asarray(is_male, dtype=bool); is_married = np.asarray(is_married, dtype=bool)
+    hh_types = np.asarray(household_types); placement = np.full(len(ages), -1, dtype=np.int64)
+    adult = ages >= 18
+
+    def pool(mask):
+        idx = rng.permutation(np.flatnonzero(mask))
+        return idx[np.argsort(~is_married[idx], kind='stable')]
+
+    def fill(people, households):
+        k = min(len(people), len(households)); placement[people[:k]] = households[:k]
+        return people[k:]
+
+    males, females = pool(adult & is_male), pool(adult & ~is_male)
+    couples = rng.permutation(np.flatnonzero(hh_types == FAMILY_HOUSEHOLDS[0]))
+    k = min(len(couples), len(males), len(females))
+    placement[males[:k]] = couples[:k]; placement[females[:k]] = couples[:k]; males, females = males[k:], females[k:]
+    males = fill(males, np.flatnonzero(hh_types == FAMILY_HOUSEHOLDS[1]))
+    females = fill(females, np.flatnonzero(hh_types == FAMILY_HOUSEHOLDS[2]))
+    rest = fill(rng.permutation(np.concatenate([males, females])), np.flatnonzero(~np.isin(hh_types, FAMILY_HOUSEHOLDS)))
+
+    family = np.flatnonzero(np.isin(hh_types, FAMILY_HOUSEHOLDS))
+    if len(family) == 0: family = np.arange(len(hh_types))
+    children = np.flatnonzero(~adult)
+    placement[children] = family[rng.integers(len(family), size=len(children))]
+    placement[rest] = rng.integers(len(hh_types), size=len(rest))
+    return placement
\ No newline at end of file
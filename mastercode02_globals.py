@@ -1,27 +1,33 @@
 # mastercode02_globals.py
+from mastercode02_marriage_market import MarriageMarket
+from mastercode02_registry import Registry
+from mastercode02_vehicles import VehicleTable
 
 # --- Main Simulation Containers ---
-POPULATION = []
+POPULATION = Registry()
 HOUSEHOLDS = {}
 MARRIAGES = []
+MARRIAGE_MARKET = MarriageMarket()
+VEHICLES = VehicleTable()
 
 # --- Resource Dictionaries ---
 EDUCATION_RESOURCE = {}
 EMPLOYER_RESOURCE = {}
 
 # --- ID Counters ---
-_person_id_counter = 73440; _household_id_counter = 31162; _marriage_id_counter = 0; _car_id_counter = 0
+PERSON_ID_START = 73440; HOUSEHOLD_ID_START = 31162
+_person_id_counter = PERSON_ID_START; _household_id_counter = HOUSEHOLD_ID_START; _marriage_id_counter = 0
 def next_person_id(): global _person_id_counter; _person_id_counter += 1; return _person_id_counter
 def next_household_id(): global _household_id_counter; _household_id_counter += 1; return _household_id_counter
 def next_marriage_id(): global _marriage_id_counter; _marriage_id_counter += 1; return _marriage_id_counter
-def next_car_id(): global _car_id_counter; _car_id_counter += 1; return f"CAR_{_car_id_counter}"
 
 # --- Annual Data for Logging ---
 ANNUAL_SUMMARY_DATA = {}
-VEHICLE_EVENTS = []
-TRIP_SUMMARY = []
+VEHICLE_EVENTS = []  # (year, code, car_id, owner_id, other_id), see mastercode02_vehicles
+TRIP_SUMMARY = {}  # commute purpose -> trips this year
 RATES_LOG = []
 annual_education_stats = {}
+labour_market_stats = {}
 
 # --- Annual trackers for capped financial resources ---
 annual_savings_accepted = 0
@@ -44,5 +50,42 @@ arima_birth_rate_modifier = 1.0
 arima_death_rate_modifier = 1.0
 arima_marriage_rate_modifier = 1.0
 
+# --- Pre-sampled forecast draws for this run (years x PATH_SERIES, see mastercode02_forecasts.sample_macro_paths) ---
+MACRO_PATH = None
+
 # --- Latest calculated score for dynamic managers ---
-latest_economic_index = 100.0
\ No newline at end of file
+latest_economic_index = 100.0
+
+# --- Opt-in next-event scheduling of deaths and births (mastercode02_hazards) ---
+HAZARD_SCHEDULING = False
+
+# --- Shared per-year aggregates (mastercode02_snapshot.PopulationSnapshot) ---
+ANNUAL_SNAPSHOT = None
+
+# Module-level scalars that make up the run state (see reset() and mastercode02_checkpoint).
+SCALAR_STATE = ['_person_id_counter', '_household_id_counter', '_marriage_id_counter',
+                'annual_savings_accepted', 'annual_loans_disbursed', 'annual_gov_support_disbursed', 'refused_log',
+                'event_birth_rate_modifier', 'event_death_rate_modifier', 'event_employment_rate_modifier', 'event_inflation_modifier',
+                'event_income_modifier', 'event_gov_support_modifier', 'event_gov_cap_modifier', 'event_dropout_prob',
+                'arima_birth_rate_modifier', 'arima_death_rate_modifier', 'arima_marriage_rate_modifier', 'latest_economic_index', 'HAZARD_SCHEDULING', 'MACRO_PATH']
+
+def reset():
+    """Restores every container, counter, tracker and modifier to its start-of-run value.
+
+    Containers are cleared in place, so managers holding references to them stay valid.
+    """
+    global _person_id_counter, _household_id_counter, _marriage_id_counter
+    global annual_savings_accepted, annual_loans_disbursed, annual_gov_support_disbursed, refused_log
+    global event_birth_rate_modifier, event_death_rate_modifier, event_employment_rate_modifier, event_inflation_modifier
+    global event_income_modifier, event_gov_support_modifier, event_gov_cap_modifier, event_dropout_prob
+    global arima_birth_rate_modifier, arima_death_rate_modifier, arima_marriage_rate_modifier, latest_economic_index, ANNUAL_SNAPSHOT, HAZARD_SCHEDULING, MACRO_PATH
+    POPULATION.clear(); HOUSEHOLDS.clear(); MARRIAGES.clear(); MARRIAGE_MARKET.clear(); VEHICLES.clear()
+    EDUCATION_RESOURCE.clear(); EMPLOYER_RESOURCE.clear()
+    ANNUAL_SUMMARY_DATA.clear(); VEHICLE_EVENTS.clear(); TRIP_SUMMARY.clear(); RATES_LOG.clear(); annual_education_stats.clear(); labour_market_stats.clear()
+    _person_id_counter = PERSON_ID_START; _household_id_counter = HOUSEHOLD_ID_START; _marriage_id_counter = 0
+    annual_savings_accepted = 0; annual_loans_disbursed = 0; annual_gov_support_disbursed = 0
+    refused_log = {'savings': 0, 'loans': 0, 'gov_support': 0}
+    event_birth_rate_modifier = 1.0; event_death_rate_modifier = 1.0; event_employment_rate_modifier = 1.0; event_inflation_modifier = 1.0
+    event_income_modifier = 1.0; event_gov_support_modifier = 1.0; event_gov_cap_modifier = 1.0; event_dropout_prob = 0.0
+    arima_birth_rate_modifier = 1.0; arima_death_rate_modifier = 1.0; arima_marriage_rate_modifier = 1.0
+    latest_economic_index = 100.0; ANNUAL_SNAPSHOT = None; HAZARD_SCHEDULING = False; MACRO_PATH = None
@@ -0,0 +1,98 @@
+# mastercode02_hazards.py
+# Opt-in next-event scheduling for deaths and births (run_simulation(..., hazards=True)).
+# Instead of every Person rolling a yearly Bernoulli draw, HazardManager samples each person's
+# time to death and each woman's time to next birth from the age-specific hazards in RATES and
+# only schedules those events, at their (fractional) times. Samples are redrawn whenever the
+# ARIMA or scenario modifiers change, so the per-agent cost no longer grows with finer time steps.
+import heapq, math
+import numpy as np
+import salabim as sim
+from mastercode02_codes import age_group_index, rate_table
+import mastercode02_globals as g
+from mastercode02_rng import np_stream
+from mastercode02_profile import touched
+
+MAX_AGE = 130
+SEX_ROW = {'Male': 0, 'Female': 1}
+FERTILE_AGES = (15, 50)
+
+def hazard_row(rates_by_group, ages=(0, MAX_AGE + 1)):
+    """Yearly hazards -log(1 - p) for every single year of age 0..MAX_AGE from a {'0-4': p, ...} table.
+
+    Ages outside ``ages`` (a half-open range) get zero hazard. With a constant hazard h over a year,
+    P(event within the year) = 1 - exp(-h) = p, so the yearly Bernoulli probabilities are kept exactly.
+    """
+    years = np.arange(MAX_AGE + 1)
+    p = np.where((years >= ages[0]) & (years < ages[1]), rate_table(rates_by_group)[age_group_index(years)], 0.0)
+    return -np.log1p(-np.minimum(p, 0.999999))
+
+def sample_event_times(now, ages, rows, multipliers, table, rng):
+    """Samples absolute event times for people of integer ``ages`` at time ``now``.
+
+    ``table[row]`` is a hazard_row, scaled per person by ``multipliers``. Hazards are piecewise constant over
+    each year of age and ages advance at integer times. Returns inf where the event never happens.
+    """
+    ages = np.minimum(np.asarray(ages, dtype=np.int64), MAX_AGE - 1); rows = np.asarray(rows, dtype=np.int64)
+    n = len(ages); times = np.full(n, np.inf)
+    if n == 0: return times
+    target = rng.standard_exponential(n) / np.maximum(np.asarray(multipliers, dtype=float), 1e-12)
+    cum = np.concatenate([np.zeros((len(table), 1)), np.cumsum(table, axis=1)], axis=1)
+    year_end = math.floor(now) + 1; remaining = year_end - now
+    h_now = table[rows, ages]
+    first = target < h_now * remaining
+    times[first] = now + target[first] / h_now[first]
+    rest = np.flatnonzero(~first)
+    start = ages[rest] + 1; needed = cum[rows[rest], start] + target[rest] - h_now[rest] * remaining
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for r in np.unique(rows[rest]).tolist():
+            sel = rows[rest] == r
+            x = np.minimum(np.searchsorted(cum[r], needed[sel], side='right') - 1, MAX_AGE)
+            times[rest[sel]] = year_end + (x - start[sel]) + (needed[sel] - cum[r, x]) / table[r, x]
+    times[~np.isfinite(times)] = np.inf
+    return times
+
+class HazardManager(sim.Component):
+    """Fires scheduled deaths and births; replaces the yearly draws in Person.process when g.HAZARD_SCHEDULING is set.
+
+    Its year-end hold is always the last one scheduled, so at each year boundary it wakes after the Person
+    processes and managers and samples the coming year from the new ages and modifiers.
+    """
+    def setup(self):
+        rates = self.env.RATES
+        self.death_table = np.stack([hazard_row(rates['Death Rates']['Male']), hazard_row(rates['Death Rates']['Female'])])
+        self.fertility_table = np.stack([hazard_row(rates['Fertility Rate']['Unmarried'], FERTILE_AGES), hazard_row(rates['Fertility Rate']['Married'], FERTILE_AGES)])
+        self.death_times = {}; self.queue = []; self.modifiers = None; self.mothers = set()
+
+    def _modifiers(self):
+        return (g.arima_death_rate_modifier * g.event_death_rate_modifier, g.arima_birth_rate_modifier * g.event_birth_rate_modifier)
+
+    def _schedule(self, year_end):
+        """(Re)draws pending events from now; deaths are kept across years until the modifiers change."""
+        now = self.env.now(); people = list(g.POPULATION); modifiers = self._modifiers(); touched(len(people))
+        if modifiers != self.modifiers: self.death_times.clear(); self.modifiers = modifiers
+        self.death_times = {p.id: self.death_times[p.id] for p in people if p.id in self.death_times}
+        new = [p for p in people if p.id not in self.death_times]
+        times = sample_event_times(now, [p.age for p in new], [SEX_ROW[p.sex] for p in new], np.full(len(new), modifiers[0]), self.death_table, np_stream('mortality'))
+        self.death_times.update(zip((p.id for p in new), times.tolist()))
+
+        women = [p for p in people if p.sex == 'Female' and FERTILE_AGES[0] <= p.age < FERTILE_AGES[1] and p.id not in self.mothers]
+        boost = np.array([1.5 if p.years_married is not None and p.years_married <= 10 else 1.0 for p in women])
+        births = sample_event_times(now, [p.age for p in women], [int('Married' in p.marital_status) for p in women], modifiers[1] * boost, self.fertility_table, np_stream('fertility'))
+        self.queue = [(t, p.id, 'death', p) for p in people if (t := self.death_times[p.id]) < year_end]
+        self.queue += [(t, p.id, 'birth', p) for p, t in zip(women, births.tolist()) if t < year_end]
+        heapq.heapify(self.queue)
+
+    def process(self):
+        while True:
+            year_end = math.floor(self.env.now()) + 1; self.mothers.clear()
+            self._schedule(year_end)
+            while self.queue:
+                when = self.queue[0][0]
+                if when > self.env.now(): yield self.hold(till=when)
+                if self._modifiers() != self.modifiers: self._schedule(year_end); continue
+                _, _, kind, person = heapq.heappop(self.queue)
+                if person not in g.POPULATION: continue
+                touched(1)
+                if kind == 'death': person.die()
+                else: self.mothers.add(person.id); person.give_birth(g.HOUSEHOLDS, g.POPULATION)
+            yield self.hold(till=year_end)
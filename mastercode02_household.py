@@ -0,0 +1,50 @@
+# mastercode02_household.py
+from mastercode02_registry import Registry
+
+def is_student(person):
+    return 'University' in person.education or 'program' in person.education
+
+class Household(dict):
+    """A household record whose member aggregates are kept up to date as members change.
+
+    Still a dict for its finance and logging fields ('id', 'type', 'members', 'births', 'savings_balance', ...),
+    so hh['key'] / hh.get() keep working. Membership goes through add_member / remove_member, and Person
+    refreshes its entry whenever age, employment, income, education or cars change (see Person.household),
+    so the annual passes read adults, children, working_adults, employed, students, income and cars in O(1).
+    adult_members maps the ids of the adult members to the persons themselves (a member is appended once they
+    join as, or turn, an adult).
+    """
+    __slots__ = ('adults', 'children', 'working_adults', 'employed', 'students', 'income', 'cars', 'adult_members', '_accounted')
+
+    def __init__(self, members=(), **fields):
+        super().__init__(fields, members=Registry())
+        self.adults = 0; self.children = 0; self.working_adults = 0; self.employed = 0; self.students = 0
+        self.income = 0.0; self.cars = 0; self.adult_members = {}; self._accounted = {}
+        for p in members: self.add_member(p)
+
+    def add_member(self, person):
+        self['members'].append(person); person.household = self; self._account(person)
+
+    def remove_member(self, person):
+        self['members'].remove(person); self._unaccount(person); self.adult_members.pop(person.id, None); person.household = None
+
+    def discard_member(self, person):
+        if person in self['members']: self.remove_member(person)
+
+    def update_member(self, person):
+        self._unaccount(person); self._account(person)
+        if person.age < 18: self.adult_members.pop(person.id, None)
+
+    def _account(self, p):
+        adult = p.age >= 18; employed = p.employment_status == 'Employed'
+        entry = (adult, employed, is_student(p), p.annual_income, len(p.cars))
+        self._accounted[p.id] = entry
+        if adult: self.adult_members.setdefault(p.id, p)
+        self.adults += adult; self.children += not adult; self.working_adults += adult and employed
+        self.employed += employed; self.students += entry[2]; self.income += entry[3]; self.cars += entry[4]
+
+    def _unaccount(self, p):
+        adult, employed, student, income, cars = self._accounted.pop(p.id)
+        self.adults -= adult; self.children -= not adult; self.working_adults -= adult and employed
+        self.employed -= employed; self.students -= student; self.income -= income; self.cars -= cars
+        if not self._accounted: self.income = 0.0
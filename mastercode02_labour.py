@@ -0,0 +1,82 @@
+# mastercode02_labour.py
+import heapq
+import numpy as np
+from mastercode02_config_and_rates import SKILL_LEVELS
+from mastercode02_codes import (EMPLOYER_IDS, EMPLOYER_CODE, EDUCATION_CODE, NO_EMPLOYER, INCOME_BAND_LOW, INCOME_BAND_HIGH,
+                                age_group_index, rate_table, skill_index)
+from mastercode02_rng import np_stream
+import mastercode02_globals as g
+
+# --- Yearly job-market clearing shared by the agent and cohort engines ---
+# Seekers weight employers by the midpoint of the income band for their skill: BAND_MIDPOINT[skill, employer].
+BAND_MIDPOINT = ((INCOME_BAND_LOW + INCOME_BAND_HIGH) / 2).T
+
+def match_jobs(skills, vacancies, rng):
+    """Matches hire-ready seekers (skill index per seeker) to open seats (per employer code) in batched rounds.
+
+    Each round every unplaced seeker applies to one open employer drawn in proportion to the pay for
+    their skill; an oversubscribed employer keeps its most skilled applicants (random among equals)
+    and the rest try again among the employers still hiring. ``rng`` is np.random or a Generator.
+    Returns (employer code per seeker, NO_EMPLOYER if unplaced; first-choice applicants per employer).
+    """
+    skills = np.asarray(skills, dtype=np.int64); vacancies = np.array(vacancies, dtype=np.int64)
+    assigned = np.full(len(skills), NO_EMPLOYER, dtype=np.int64); applicants = None
+    pending = np.arange(len(skills))
+    while len(pending) and (vacancies > 0).any():
+        cum = np.cumsum(BAND_MIDPOINT[skills[pending]] * (vacancies > 0), axis=1)
+        choice = (cum <= (rng.random(len(pending)) * cum[:, -1])[:, None]).sum(axis=1)
+        # A draw that rounds up to the total counts every bucket; clamp it to the last employer still hiring.
+        choice = np.minimum(choice, np.flatnonzero(vacancies > 0)[-1])
+        if applicants is None: applicants = np.bincount(choice, minlength=len(vacancies))
+        order = np.lexsort((rng.random(len(pending)), -skills[pending], choice)); choice = choice[order]
+        rank = np.arange(len(choice)) - np.searchsorted(choice, choice)
+        placed = rank < vacancies[choice]
+        assigned[pending[order[placed]]] = choice[placed]
+        vacancies -= np.bincount(choice[placed], minlength=len(vacancies))
+        pending = pending[order[~placed]]
+    return assigned, applicants if applicants is not None else np.zeros(len(vacancies), dtype=np.int64)
+
+def draw_incomes(employers, skills, rng):
+    """Starting salaries for new hires, uniform in the employer's band for their skill (before event modifiers)."""
+    low = INCOME_BAND_LOW[employers, skills]; high = INCOME_BAND_HIGH[employers, skills]
+    return low + (high - low) * rng.random(len(low))
+
+def record_labour_market(vacancies, applicants, assigned, laid_off_employers):
+    """Stores this year's per-employer market counts in g.labour_market_stats for the yearly log."""
+    hired = np.bincount(assigned[assigned >= 0], minlength=len(EMPLOYER_IDS))
+    layoffs = np.bincount(np.asarray(laid_off_employers, dtype=np.int64), minlength=len(EMPLOYER_IDS))
+    for code, emp_id in enumerate(EMPLOYER_IDS):
+        g.labour_market_stats[emp_id] = {'vacancies': int(vacancies[code]), 'seekers': int(applicants[code]), 'hired': int(hired[code]), 'layoffs': int(layoffs[code])}
+    g.labour_market_stats['unplaced'] = int((assigned < 0).sum())
+
+# --- Agent-engine market clearing, run by mastercode02_snapshot.PopulationSweep ---
+JOB_SEEKING_STATUSES = ('Not in Labor Force', 'Unemployed')
+
+def is_job_candidate(p):
+    return p.employment_status in JOB_SEEKING_STATUSES and 18 <= p.age < 65
+
+def clear_labour_market(env, employed, candidates):
+    """Layoffs, then every hire-ready candidate is matched to open seats in one batch.
+
+    ``employed`` and ``candidates`` (see is_job_candidate) are (population position, person) pairs in population
+    order, gathered by the sweep before any layoff; laid-off persons join the candidates in the same order.
+    """
+    rng = np_stream('labour')
+    laid_off = [(i, p) for (i, p), u in zip(employed, rng.random(len(employed)).tolist()) if u < 0.05]
+    laid_off_employers = [EMPLOYER_CODE[p.employer] for _, p in laid_off if p.employer in EMPLOYER_CODE]
+    for _, p in laid_off:
+        if p.employer in g.EMPLOYER_RESOURCE: g.EMPLOYER_RESOURCE[p.employer].release(p)
+        p.layoff_status = True; p.employment_status = 'Unemployed'; p.employer = None; p._assign_skill_and_income()
+
+    candidates = [p for _, p in heapq.merge(candidates, [(i, p) for i, p in laid_off if is_job_candidate(p)], key=lambda c: c[0])]
+    job_chance = rate_table(env.RATES['Employment']['Employed'])[age_group_index([p.age for p in candidates])] * g.event_employment_rate_modifier
+    seekers = [p for p, ready in zip(candidates, (rng.random(len(candidates)) < job_chance).tolist()) if ready]
+    skills = skill_index([EDUCATION_CODE.get(p.education, 0) for p in seekers])
+    vacancies = np.array([g.EMPLOYER_RESOURCE[emp_id].available_quantity() for emp_id in EMPLOYER_IDS])
+    assigned, applicants = match_jobs(skills, vacancies, rng)
+    hired = np.flatnonzero(assigned >= 0)
+    incomes = draw_incomes(assigned[hired], skills[hired], rng) * g.event_income_modifier
+    for i, income in zip(hired.tolist(), incomes.tolist()):
+        p = seekers[i]; emp_id = EMPLOYER_IDS[assigned[i]]; g.EMPLOYER_RESOURCE[emp_id].claim(p)
+        p.employment_status = 'Employed'; p.employer = emp_id; p.skill_level = SKILL_LEVELS[skills[i]]; p.annual_income = income
+    record_labour_market(vacancies, applicants, assigned, laid_off_employers)
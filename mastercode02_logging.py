@@ -3,31 +3,68 @@ import pandas as pd
 import numpy as np
 import mastercode02_globals as g
 import traceback
-from mastercode02_config_and_rates import (SIMULATION_DURATION, ROAD_NETWORK_CAPACITY,
+from mastercode02_snapshot import population_snapshot
+from mastercode02_logsink import LogSink, export_rows
+from mastercode02_vehicles import car_label
+from mastercode02_panel import PanelWriter
+from mastercode02_config_and_rates import (SIMULATION_DURATION, ROAD_NETWORK_CAPACITY, EMPLOYERS,
                                              BANK_SAVINGS_ANNUAL_CAPACITY, BANK_LOAN_ANNUAL_CAPACITY,
                                              GOVERNMENT_SPENDING_ANNUAL_CAP)
 
 LOG_DATA = {
     'population_datasheet': [], 'household_datasheet': [], 'annual_summary': [],
     'marriage_summary': [], 'vehicle_events': [], 'trip_summary': [], 'rates_summary': [],
-    'resource_summary': [],
+    'resource_summary': [], 'labour_market_summary': [],
     'scores_summary': []
 }
 
-def log_yearly_data(year, env, growth_rate):
-    if year == SIMULATION_DURATION:
+# Optional LogSink that streams LOG_DATA to disk at the end of every year (see open_log_sink), and
+# optional PanelWriter that records the yearly person/household panel (see open_panel_writer).
+_SINK = None
+_PANEL = None
+# Latest logged marriage record of each man_id / woman_id, filled as marriages move into LOG_DATA.
+MARRIAGE_INDEX = {}
+
+def reset_log_data():
+    global _SINK, _PANEL
+    for rows in LOG_DATA.values(): rows.clear()
+    MARRIAGE_INDEX.clear(); _SINK = None; _PANEL = None
+
+def index_marriages(records):
+    for m in records: MARRIAGE_INDEX[m.get('man_id')] = m; MARRIAGE_INDEX[m.get('woman_id')] = m
+
+def open_log_sink(base_filename, log_format='auto'):
+    """Streams the logs to '<base_filename>_*' from now on, flushing each year, instead of writing CSVs at the end."""
+    global _SINK
+    _SINK = LogSink(base_filename, log_format)
+    return _SINK
+
+def open_panel_writer(base_filename):
+    """Records the changed person and household rows of every logged year to '<base_filename>_panel_*'."""
+    global _PANEL
+    _PANEL = PanelWriter(base_filename)
+    return _PANEL
+
+def _flush_log_sink(year):
+    if _SINK is not None: _SINK.flush(LOG_DATA, year)
+
+def log_yearly_data(year, env, growth_rate, final_year=SIMULATION_DURATION):
+    if year == final_year:
         _log_population_datasheet(year)
         _log_household_datasheet(year)
+    if _PANEL is not None: _PANEL.record(year)
 
     _log_annual_summary(year, env, growth_rate)
     _log_new_summaries(year, env)
     _log_annual_resource_summary(year, env)
-    _log_annual_scores(year, env)
+    _log_labour_market_summary(year)
+    snapshot = population_snapshot(env); _log_annual_scores(year, snapshot.high_risk_drivers, snapshot.old_vehicles)
+    _flush_log_sink(year)
 
 def _log_population_datasheet(year):
     for p in g.POPULATION:
         household = g.HOUSEHOLDS.get(p.household_id, {})
-        marriage_info = next((m for m in reversed(LOG_DATA['marriage_summary']) if m.get('man_id') == p.id or m.get('woman_id') == p.id), None)
+        marriage_info = MARRIAGE_INDEX.get(p.id)
         LOG_DATA['population_datasheet'].append({
             'year': year, 'person_id': p.id, 'age': p.age, 'sex': p.sex,
             'new household_id': p.household_id, 'household_type': household.get('type', 'N/A'),
@@ -37,7 +74,7 @@ def _log_population_datasheet(year):
             'education_level': p.education, 'employment_status': p.employment_status,
             'Emplolyment Rank': p.skill_level, 'employer': p.employer,
             'Layoff/ dismissed / quit before?': p.layoff_status,
-            'Has a car?': bool(p.cars), 'Car ID': ", ".join([str(c['id']) for c in p.cars]), 'Use the Bus?': p.use_bus,
+            'Has a car?': bool(p.cars), 'Car ID': ", ".join([car_label(c) for c in p.cars]), 'Use the Bus?': p.use_bus,
             'Accident Involvement': p.accident_involvement,
             'Most used Purpose of comutation': p.commute_purpose,
             'Annual Income': p.annual_income, 'Gov_support_cum per person': p.gov_support_cum
@@ -50,9 +87,8 @@ def _log_household_datasheet(year):
         LOG_DATA['household_datasheet'].append({
             'household_id': hh_id, 'household_type': hh_data.get('type'), 'household_members': len(members),
             'births_in_hh': hh_data.get('births', 0), 'deaths_in_hh': hh_data.get('deaths', 0), 'marriages_in_hh': hh_data.get('marriages', 0),
-            'students_in_hh': sum(1 for p in members if 'University' in p.education or 'program' in p.education),
-            'employed_in_hh': sum(1 for p in members if p.employment_status == 'Employed'),
-            'Have a car?': any(p.cars for p in members), 'How many cars in household': sum(len(p.cars) for p in members),
+            'students_in_hh': hh_data.students, 'employed_in_hh': hh_data.employed,
+            'Have a car?': hh_data.cars > 0, 'How many cars in household': hh_data.cars,
             'use bus?': any(p.use_bus for p in members),
             'Household Annual Income': hh_data.get('total_income', 0), 'Required Cost_Pre tax': hh_data.get('required_cost', 0),
             'Net_income_minus_cost': hh_data.get('total_income', 0) - hh_data.get('required_cost', 0),
@@ -61,53 +97,75 @@ def _log_household_datasheet(year):
         })
 
 def _log_annual_summary(year, env, growth_rate):
-    current_pop = len(g.POPULATION)
-    prev_pop = current_pop / (1 + growth_rate) if (1 + growth_rate) != 0 else current_pop
     births = sum(h.get('births', 0) for h in g.HOUSEHOLDS.values()); deaths = sum(h.get('deaths', 0) for h in g.HOUSEHOLDS.values())
-    employed = sum(1 for p in g.POPULATION if p.employment_status == 'Employed'); labor_force = sum(1 for p in g.POPULATION if p.employment_status not in ['Too Young', 'Retired', 'student'])
-    all_incomes = [p.annual_income for p in g.POPULATION if p.annual_income > 0]; all_costs = [h.get('required_cost', 0) for h in g.HOUSEHOLDS.values()]
+    snapshot = population_snapshot(env)
+    _append_annual_summary(year, env, growth_rate, len(g.POPULATION), births, deaths, snapshot.employed, snapshot.labor_force,
+                           np.mean(snapshot.incomes or [0]), snapshot.total_cars)
+    for hh in g.HOUSEHOLDS.values(): hh['births'] = 0; hh['deaths'] = 0; hh['marriages'] = 0
+
+def _append_annual_summary(year, env, growth_rate, current_pop, births, deaths, employed, labor_force, avg_income, total_cars):
+    prev_pop = current_pop / (1 + growth_rate) if (1 + growth_rate) != 0 else current_pop
+    all_costs = [h.get('required_cost', 0) for h in g.HOUSEHOLDS.values()]
     all_savings = [h.get('savings_balance', 0) for h in g.HOUSEHOLDS.values()]; all_loans = [h.get('loan_balance', 0) for h in g.HOUSEHOLDS.values()]
     LOG_DATA['annual_summary'].append({
         'Year': year, 'Population': current_pop, 'Households': len(g.HOUSEHOLDS), 'Population Growth rate': growth_rate,
         'No of births': births, 'Birth rate': births / prev_pop if prev_pop > 0 else 0,
         'No. of Deaths': deaths, 'Death rate': deaths / prev_pop if prev_pop > 0 else 0,
         'Employment Rate': employed / labor_force if labor_force > 0 else 0,
-        'Avg Annual Income': np.mean(all_incomes or [0]), 'Avg Annual Req Cost': np.mean(all_costs or [0]),
+        'Avg Annual Income': avg_income, 'Avg Annual Req Cost': np.mean(all_costs or [0]),
         'Avg Savings Balance': np.mean(all_savings or [0]), 'Avg Loan Balance': np.mean(all_loans or [0]),
-        'Total Number of Cars': sum(len(p.cars) for p in g.POPULATION),
+        'Total Number of Cars': total_cars,
         'Number of Accidents on road': g.ANNUAL_SUMMARY_DATA.get('num_accidents', 0),
         'Cost Inflation rate': env.cpi_inflation,
     })
-    for hh in g.HOUSEHOLDS.values(): hh['births'] = 0; hh['deaths'] = 0; hh['marriages'] = 0
+
+def log_cohort_yearly_data(year, env, engine, growth_rate):
+    """Array-engine counterpart of log_yearly_data: the same per-year tables, from CohortEngine.aggregates()."""
+    agg = engine.aggregates()
+    _append_annual_summary(year, env, growth_rate, agg['population'], agg['births'], agg['deaths'], agg['employed'], agg['labor_force'],
+                           agg['avg_income'], agg['total_cars'])
+    _log_new_summaries(year, env)
+    _log_annual_resource_summary(year, env, agg['employer_in_use'])
+    _log_labour_market_summary(year)
+    _log_annual_scores(year, agg['high_risk_drivers'], agg['old_vehicles'])
+    _flush_log_sink(year)
 
 def _log_new_summaries(year, env):
-    LOG_DATA['marriage_summary'].extend(g.MARRIAGES); g.MARRIAGES.clear()
+    index_marriages(g.MARRIAGES); LOG_DATA['marriage_summary'].extend(g.MARRIAGES); g.MARRIAGES.clear()
     LOG_DATA['vehicle_events'].extend(g.VEHICLE_EVENTS); g.VEHICLE_EVENTS.clear()
     if g.TRIP_SUMMARY:
-        df = pd.DataFrame(g.TRIP_SUMMARY); purpose_counts = df.groupby('purpose').size().reset_index(name='count'); purpose_counts['year'] = year
-        LOG_DATA['trip_summary'].append(purpose_counts)
+        LOG_DATA['trip_summary'].extend({'purpose': purpose, 'count': g.TRIP_SUMMARY[purpose], 'year': year} for purpose in sorted(g.TRIP_SUMMARY))
     g.TRIP_SUMMARY.clear()
     LOG_DATA['rates_summary'].append({ 'year': year, 'arima_death_rate_mod': g.arima_death_rate_modifier, 'event_death_rate_mod': g.event_death_rate_modifier, 'tax_rate': env.tax_rate, 'salary_inflation': env.salary_inflation, 'cpi_inflation': env.cpi_inflation })
 
-def _log_annual_resource_summary(year, env):
+def _log_annual_resource_summary(year, env, employer_in_use=None):
     for level_name, res in g.EDUCATION_RESOURCE.items():
         stats = g.annual_education_stats.get(level_name, {'in_use': 0, 'refused': 0}); capacity = res.capacity(); in_use = stats['in_use']; refused = stats['refused']
         LOG_DATA['resource_summary'].append({ 'year': year, 'name': level_name, 'capacity': capacity, 'in_use': in_use, 'waiting_or_refused': refused, 'utilization': in_use / capacity if capacity > 0 else 0 })
-    for res in g.EMPLOYER_RESOURCE.values():
-        capacity = res.capacity(); in_use = res.claimed_quantity(); waiting = len(res.requesters())
+    for emp_id, res in g.EMPLOYER_RESOURCE.items():
+        capacity = res.capacity(); in_use = res.claimed_quantity() if employer_in_use is None else employer_in_use[emp_id]; waiting = len(res.requesters())
         LOG_DATA['resource_summary'].append({ 'year': year, 'name': res.name(), 'capacity': capacity, 'in_use': in_use, 'waiting_or_refused': waiting, 'utilization': in_use / capacity if capacity > 0 else 0 })
     LOG_DATA['resource_summary'].append({'year': year, 'name': 'Bank (Savings)', 'capacity': BANK_SAVINGS_ANNUAL_CAPACITY, 'in_use': g.annual_savings_accepted, 'waiting_or_refused': g.refused_log['savings'], 'utilization': g.annual_savings_accepted / BANK_SAVINGS_ANNUAL_CAPACITY if BANK_SAVINGS_ANNUAL_CAPACITY > 0 else 0})
     LOG_DATA['resource_summary'].append({'year': year, 'name': 'Bank (Loan)', 'capacity': BANK_LOAN_ANNUAL_CAPACITY, 'in_use': g.annual_loans_disbursed, 'waiting_or_refused': g.refused_log['loans'], 'utilization': g.annual_loans_disbursed / BANK_LOAN_ANNUAL_CAPACITY if BANK_LOAN_ANNUAL_CAPACITY > 0 else 0})
     LOG_DATA['resource_summary'].append({'year': year, 'name': 'Government Support', 'capacity': GOVERNMENT_SPENDING_ANNUAL_CAP, 'in_use': g.annual_gov_support_disbursed, 'waiting_or_refused': g.refused_log['gov_support'], 'utilization': g.annual_gov_support_disbursed / GOVERNMENT_SPENDING_ANNUAL_CAP if GOVERNMENT_SPENDING_ANNUAL_CAP > 0 else 0})
     bus_capacity = getattr(env, 'total_bus_capacity', 0); bus_served = getattr(env, 'bus_passengers_served', 0); bus_refused = getattr(env, 'bus_passengers_refused', 0)
     LOG_DATA['resource_summary'].append({'year': year, 'name': 'Bus Service', 'capacity': bus_capacity, 'in_use': bus_served, 'waiting_or_refused': bus_refused, 'utilization': bus_served / bus_capacity if bus_capacity > 0 else 0})
-    total_cars = sum(len(p.cars) for p in g.POPULATION)
+    total_cars = LOG_DATA['annual_summary'][-1]['Total Number of Cars']
     for road_type, capacity in ROAD_NETWORK_CAPACITY.items():
         LOG_DATA['resource_summary'].append({'year': year, 'name': f'Road: {road_type}', 'capacity': capacity, 'in_use': total_cars, 'waiting_or_refused': 0, 'utilization': total_cars / capacity if capacity > 0 else 0})
     g.annual_savings_accepted = 0; g.annual_loans_disbursed = 0; g.annual_gov_support_disbursed = 0
     g.refused_log = {'savings': 0, 'loans': 0, 'gov_support': 0}; g.annual_education_stats.clear()
 
-def _log_annual_scores(year, env):
+def _log_labour_market_summary(year):
+    stats = g.labour_market_stats
+    if not stats: return
+    for emp_id, emp_data in EMPLOYERS.items():
+        row = stats.get(emp_id, {'vacancies': 0, 'seekers': 0, 'hired': 0, 'layoffs': 0})
+        LOG_DATA['labour_market_summary'].append({'year': year, 'employer': emp_id, 'name': emp_data['name'], 'vacancies': row['vacancies'], 'seekers': row['seekers'], 'hired': row['hired'], 'layoffs': row['layoffs'], 'unfilled': row['vacancies'] - row['hired']})
+    LOG_DATA['labour_market_summary'].append({'year': year, 'employer': 'ALL', 'name': 'Unplaced seekers', 'vacancies': 0, 'seekers': stats.get('unplaced', 0), 'hired': 0, 'layoffs': 0, 'unfilled': 0})
+    stats.clear()
+
+def _log_annual_scores(year, high_risk_drivers, old_vehicles):
     def normalize(value, min_val, max_val, lower_is_better=False):
         if lower_is_better: value, min_val, max_val = -value, -max_val, -min_val
         if (max_val - min_val) == 0: return 0.5
@@ -122,8 +180,7 @@ def _log_annual_scores(year, env):
     norm_savings = normalize(np.median(savings) if savings else 0, 0, 50000)
     norm_loans = normalize(np.median(loans) if loans else 0, 0, 200000, lower_is_better=True)
     eco_index = (norm_inflation * 0.2 + norm_gov_spend * 0.1 + norm_employment * 0.3 + norm_net_income * 0.2 + norm_savings * 0.1 + norm_loans * 0.1) * 100
-    total_cars = summary['Total Number of Cars']; high_risk_drivers = len([p for p in g.POPULATION if 16 <= p.age <= 21 and p.cars])
-    old_vehicles = sum(1 for p in g.POPULATION for car in p.cars if car.get('age',0) >= 8)
+    total_cars = summary['Total Number of Cars']
     road_util = total_cars / sum(ROAD_NETWORK_CAPACITY.values()) if sum(ROAD_NETWORK_CAPACITY.values()) > 0 else 0
     norm_congestion = normalize(road_util, 0.2, 1.0, lower_is_better=True)
     norm_accidents = normalize(summary['Number of Accidents on road'], 50, 500, lower_is_better=True)
@@ -134,6 +191,13 @@ def _log_annual_scores(year, env):
     g.latest_economic_index = eco_index
 
 def write_and_close_csv_logs(base_filename, env):
+    global _SINK, _PANEL
+    if _PANEL is not None: _PANEL.close(); _PANEL = None
+    if _SINK is not None:
+        print(f"\n--- Flushing streamed logs ({_SINK.format}) with base name: {_SINK.base_filename} ---")
+        try: _SINK.flush(LOG_DATA, int(env.now()))
+        except Exception: print("\n--- A CRITICAL ERROR OCCURRED DURING LOG FLUSHING ---"); traceback.print_exc()
+        _SINK = None; return
     print(f"\n--- Writing final logs to CSV files with base name: {base_filename} ---")
     try:
         float_format = '%.2f'
@@ -141,10 +205,11 @@ def write_and_close_csv_logs(base_filename, env):
         if LOG_DATA['household_datasheet']: pd.DataFrame(LOG_DATA['household_datasheet']).to_csv(f"{base_filename}_household_datasheet.csv", index=False, float_format=float_format)
         pd.DataFrame(LOG_DATA['annual_summary']).to_csv(f"{base_filename}_annual_summary.csv", index=False, float_format=float_format)
         if LOG_DATA['marriage_summary']: pd.DataFrame(LOG_DATA['marriage_summary']).to_csv(f"{base_filename}_summary_marriages.csv", index=False)
-        if LOG_DATA['vehicle_events']: pd.DataFrame(LOG_DATA['vehicle_events']).to_csv(f"{base_filename}_summary_vehicle_events.csv", index=False)
-        if LOG_DATA['trip_summary']: pd.concat(LOG_DATA['trip_summary']).to_csv(f"{base_filename}_summary_trips.csv", index=False)
+        if LOG_DATA['vehicle_events']: pd.DataFrame(export_rows('vehicle_events', LOG_DATA['vehicle_events'])).to_csv(f"{base_filename}_summary_vehicle_events.csv", index=False)
+        if LOG_DATA['trip_summary']: pd.DataFrame(LOG_DATA['trip_summary']).to_csv(f"{base_filename}_summary_trips.csv", index=False)
         if LOG_DATA['rates_summary']: pd.DataFrame(LOG_DATA['rates_summary']).to_csv(f"{base_filename}_summary_rates.csv", index=False, float_format=float_format)
         if LOG_DATA['resource_summary']: pd.DataFrame(LOG_DATA['resource_summary']).to_csv(f"{base_filename}_summary_resources.csv", index=False, float_format=float_format)
+        if LOG_DATA['labour_market_summary']: pd.DataFrame(LOG_DATA['labour_market_summary']).to_csv(f"{base_filename}_summary_labour_market.csv", index=False)
         if LOG_DATA['scores_summary']: pd.DataFrame(LOG_DATA['scores_summary']).to_csv(f"{base_filename}_scores_summary.csv", index=False, float_format=float_format)
         print("...All CSV log files saved successfully. ✅")
     except Exception:
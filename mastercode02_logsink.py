@@ -0,0 +1,132 @@
+# mastercode02_logsink.py
+import glob, os
+import pandas as pd
+from mastercode02_vehicles import vehicle_event_records
+try:
+    import pyarrow as pa, pyarrow.ipc, pyarrow.parquet
+except ImportError:
+    pa = None
+
+# --- Streaming sink for the LOG_DATA tables ---
+# File stem per table (same names write_and_close_csv_logs uses) and the tables written with float_format.
+LOG_FILES = {'population_datasheet': 'population_datasheet', 'household_datasheet': 'household_datasheet', 'annual_summary': 'annual_summary',
+             'marriage_summary': 'summary_marriages', 'vehicle_events': 'summary_vehicle_events', 'trip_summary': 'summary_trips',
+             'rates_summary': 'summary_rates', 'resource_summary': 'summary_resources', 'labour_market_summary': 'summary_labour_market',
+             'scores_summary': 'scores_summary'}
+FLOAT_FORMAT_TABLES = {'population_datasheet', 'household_datasheet', 'annual_summary', 'rates_summary', 'resource_summary', 'scores_summary'}
+# One row per year (and annual_summary is read back by the scores), so they stay in LOG_DATA; every other
+# table is dropped from memory once written (the population datasheet reads marriages from MARRIAGE_INDEX).
+KEEP_IN_MEMORY = {'annual_summary', 'scores_summary', 'rates_summary'}
+FORMATS = ('parquet', 'arrow', 'csv')
+# Columns whose first yearly chunk would infer a narrower type than the whole run (year 0 has no float
+# bank or support totals yet), declared so that every chunk of the table is written with the same type.
+LOG_DTYPES = {'resource_summary': {'in_use': 'float64'}}
+# Tables kept as compact codes in LOG_DATA, with the function that turns their rows into the exported records.
+EXPORTERS = {'vehicle_events': vehicle_event_records}
+
+def export_rows(name, rows):
+    return EXPORTERS[name](rows) if name in EXPORTERS else rows
+
+def resolve_format(log_format):
+    """'auto' picks Parquet when pyarrow is installed and CSV otherwise."""
+    if log_format == 'auto': return 'parquet' if pa is not None else 'csv'
+    if log_format not in FORMATS: raise ValueError(f"Unknown log format {log_format!r}; expected 'auto' or one of {FORMATS}")
+    if log_format != 'csv' and pa is None: raise ImportError(f"log_format={log_format!r} needs pyarrow")
+    return log_format
+
+def _as_category(column):
+    return column.where(column.isna(), column.astype(str)).astype('category')
+
+def typed_frame(rows, dtypes=None):
+    """DataFrame of log rows with typed columns: text (and mixed id/'N/A') columns become categoricals.
+
+    ``dtypes`` ({column: dtype}, e.g. from LOG_DTYPES) fixes the type of those columns instead of inferring it.
+    """
+    df = pd.DataFrame(rows); dtypes = dtypes or {}
+    for col in df.columns:
+        if col in dtypes: df[col] = df[col].astype(dtypes[col]); continue
+        if not pd.api.types.is_string_dtype(df[col].dtype): continue
+        values = df[col].dropna()
+        if len(values) and values.map(type).eq(bool).all(): df[col] = df[col].astype('boolean')
+        else: df[col] = _as_category(df[col])
+    return df
+
+def conform(df, dtypes, name):
+    """Casts a later chunk of table ``name`` to the column types of its first chunk.
+
+    Widening (int or bool to float, anything to categorical text) is applied; a chunk that would need a column
+    narrowed (a float in a column first written as int) raises, since the earlier chunks are already on disk.
+    """
+    extra = [col for col in df.columns if col not in dtypes]
+    if extra: raise ValueError(f"Log table {name!r}: columns {extra} were not in its first chunk")
+    df = df.reindex(columns=list(dtypes))
+    for col, dtype in dtypes.items():
+        column = df[col]
+        if column.dtype == dtype: continue
+        if isinstance(dtype, pd.CategoricalDtype): df[col] = _as_category(column)
+        elif pd.api.types.is_float_dtype(dtype) and (pd.api.types.is_numeric_dtype(column) or column.isna().all()): df[col] = column.astype(dtype)
+        elif pd.api.types.is_bool_dtype(dtype) and column.dropna().map(type).eq(bool).all(): df[col] = column.astype('boolean')
+        elif pd.api.types.is_integer_dtype(dtype) and pd.api.types.is_integer_dtype(column): df[col] = column.astype(dtype)
+        else: raise ValueError(f"Log table {name!r}: column {col!r} was first written as {dtype} but now holds {column.dtype}; declare it in LOG_DTYPES")
+    return df
+
+class LogSink:
+    """Appends each year's new LOG_DATA rows to disk and trims the in-memory tables.
+
+    Parquet and Arrow IPC write one chunk file per table and year under '<base>_<table>.<ext>/'
+    (categoricals become dictionary-encoded string columns); CSV appends to the usual '<base>_<table>.csv'.
+    Each table's columns and types are fixed by its first chunk (plus LOG_DTYPES) and later chunks are cast
+    to them, so CSVs match write_and_close_csv_logs and the chunk files share one schema.
+    Read the results back with load_log().
+    """
+    def __init__(self, base_filename, log_format='auto'):
+        self.base_filename = base_filename; self.format = resolve_format(log_format)
+        self.written = {name: 0 for name in LOG_FILES}; self.started = set(); self.dtypes = {}; self.schemas = {}; self.chunks = 0
+
+    def path(self, name):
+        return f"{self.base_filename}_{LOG_FILES[name]}.{'csv' if self.format == 'csv' else self.format}"
+
+    def flush(self, log_data, year):
+        for name, rows in log_data.items():
+            new = rows[self.written[name]:]
+            if new: self._write(name, typed_frame(export_rows(name, new), LOG_DTYPES.get(name)), year)
+            if name in KEEP_IN_MEMORY: self.written[name] = len(rows)
+            else: rows.clear(); self.written[name] = 0
+
+    def _write(self, name, df, year):
+        path = self.path(name)
+        if name in self.started: df = conform(df, self.dtypes[name], name)
+        else: self.dtypes[name] = dict(df.dtypes)
+        if self.format == 'csv':
+            df.to_csv(path, mode='a' if name in self.started else 'w', header=name not in self.started, index=False,
+                      float_format='%.2f' if name in FLOAT_FORMAT_TABLES else None)
+        else:
+            if name not in self.started:
+                for old in glob.glob(os.path.join(path, '*')): os.remove(old)
+                os.makedirs(path, exist_ok=True)
+            part = os.path.join(path, f"part-{self.chunks:05d}-{year:04d}.{self.format}"); self.chunks += 1
+            if name not in self.schemas: self.schemas[name] = _arrow_schema(pa.Table.from_pandas(df, preserve_index=False).schema)
+            table = pa.Table.from_pandas(df, schema=self.schemas[name], preserve_index=False)
+            if self.format == 'parquet': pa.parquet.write_table(table, part)
+            else:
+                with pa.OSFile(part, 'wb') as f, pa.ipc.new_file(f, table.schema) as writer: writer.write_table(table)
+        self.started.add(name)
+
+def _arrow_schema(schema):
+    """The first chunk's schema, with every dictionary column widened to int32 indices over strings (pandas picks
+    the smallest index type per chunk) and without the per-chunk pandas metadata."""
+    fields = [pa.field(f.name, pa.dictionary(pa.int32(), pa.string()), f.nullable) if pa.types.is_dictionary(f.type) else f for f in schema]
+    return pa.schema(fields)
+
+def load_log(base_filename, name, log_format='auto'):
+    """Reads one table written by a LogSink (or write_and_close_csv_logs) back into a DataFrame."""
+    stem = f"{base_filename}_{LOG_FILES[name]}"
+    for fmt in (FORMATS if log_format == 'auto' else (log_format,)):
+        path = f"{stem}.{fmt}"
+        if not os.path.exists(path): continue
+        if fmt == 'csv': return pd.read_csv(path)
+        parts = sorted(glob.glob(os.path.join(path, f"part-*.{fmt}")))
+        if fmt == 'parquet': frames = [pd.read_parquet(part) for part in parts]
+        else: frames = [pa.ipc.open_file(part).read_pandas() for part in parts]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    raise FileNotFoundError(f"No log table {name!r} for {base_filename!r}")
@@ -0,0 +1,48 @@
+# mastercode02_marriage_market.py
+import random
+
+class MarriageMarket:
+    """Never-married females bucketed by birth cohort (year - age).
+
+    Everyone ages by one year per simulated year, so a person's cohort never changes and the
+    buckets only need updating on birth, death, immigration and marriage. Each bucket is a list
+    with a position map, so add/remove are O(1) (swap-remove) and a draw over the 11 cohorts
+    within +/-5 years of a given age is constant time.
+    """
+    def __init__(self):
+        self.cohorts = {}; self._slot = {}
+
+    def __len__(self):
+        return len(self._slot)
+
+    def __contains__(self, person):
+        return person.id in self._slot
+
+    def clear(self):
+        self.cohorts.clear(); self._slot.clear()
+
+    def add(self, person, now):
+        if person.id in self._slot: return
+        cohort = int(now) - person.age
+        bucket = self.cohorts.setdefault(cohort, [])
+        self._slot[person.id] = (cohort, len(bucket)); bucket.append(person)
+
+    def discard(self, person):
+        slot = self._slot.pop(person.id, None)
+        if slot is None: return
+        cohort, idx = slot; bucket = self.cohorts[cohort]
+        last = bucket.pop()
+        if last is not person:
+            bucket[idx] = last; self._slot[last.id] = (cohort, idx)
+
+    def draw(self, age, now, max_gap=5, rng=random):
+        """Returns a uniformly drawn never-married female with abs(age difference) <= max_gap, or None."""
+        centre = int(now) - age
+        buckets = [self.cohorts.get(c) for c in range(centre - max_gap, centre + max_gap + 1)]
+        total = sum(len(b) for b in buckets if b)
+        if total == 0: return None
+        r = rng.randrange(total)
+        for bucket in buckets:
+            if not bucket: continue
+            if r < len(bucket): return bucket[r]
+            r -= len(bucket)
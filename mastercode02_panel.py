@@ -0,0 +1,118 @@
+# mastercode02_panel.py
+import json, os
+import numpy as np
+from mastercode02_config_and_rates import SKILL_LEVELS
+from mastercode02_codes import (SEXES, EDUCATION_LEVELS, EMPLOYMENT_STATUSES, MARITAL_STATUSES, EMPLOYER_IDS,
+                                SEX_CODE, EDUCATION_CODE, EMPLOYMENT_CODE, MARITAL_CODE, EMPLOYER_CODE, NO_EMPLOYER)
+import mastercode02_globals as g
+
+# --- Yearly person and household panel, delta-encoded on disk ---
+# Fixed-width records are appended each year to '<base>_panel_<kind>.bin', but only for ids whose columns changed
+# since their last record (alive=False marks a death or a dissolved household). Age is stored as birth_year
+# so it doesn't change every year. '<base>_panel.json' holds the dtypes and category labels, and
+# '<base>_panel_<kind>_index.npz' gives each id's rows, so a trajectory is read from a memory map without loading the run.
+PERSON_DTYPE = np.dtype([('year', '<i4'), ('id', '<i8'), ('alive', '?'), ('birth_year', '<i4'), ('sex', 'i1'), ('education', 'i1'),
+                         ('employment', 'i1'), ('employer', 'i1'), ('marital', 'i1'), ('skill_level', 'i1'), ('household_id', '<i8'),
+                         ('annual_income', '<f8'), ('gov_support_cum', '<f8'), ('cars', '<i2'), ('use_bus', '?'),
+                         ('accident_involvement', '?'), ('layoff_status', '?')])
+HOUSEHOLD_DTYPE = np.dtype([('year', '<i4'), ('id', '<i8'), ('alive', '?'), ('type', '<i2'), ('members', '<i2'), ('adults', '<i2'),
+                            ('children', '<i2'), ('employed', '<i2'), ('students', '<i2'), ('cars', '<i2'), ('births', '<i2'),
+                            ('deaths', '<i2'), ('total_income', '<f8'), ('required_cost', '<f8'), ('savings_balance', '<f8'),
+                            ('loan_balance', '<f8'), ('taxes_cum', '<f8')])
+DTYPES = {'persons': PERSON_DTYPE, 'households': HOUSEHOLD_DTYPE}
+SKILL_CODE = {name: i for i, name in enumerate(SKILL_LEVELS)}
+PERSON_CATEGORIES = {'sex': SEXES, 'education': EDUCATION_LEVELS, 'employment': EMPLOYMENT_STATUSES, 'employer': EMPLOYER_IDS,
+                     'marital': MARITAL_STATUSES, 'skill_level': SKILL_LEVELS}
+
+def _person_records(year):
+    people = list(g.POPULATION); rec = np.zeros(len(people), dtype=PERSON_DTYPE)
+    rec['year'] = year; rec['alive'] = True
+    rec['id'] = [p.id for p in people]; rec['birth_year'] = [year - p.age for p in people]
+    rec['sex'] = [SEX_CODE.get(p.sex, -1) for p in people]; rec['education'] = [EDUCATION_CODE.get(p.education, -1) for p in people]
+    rec['employment'] = [EMPLOYMENT_CODE.get(p.employment_status, -1) for p in people]
+    rec['employer'] = [EMPLOYER_CODE.get(p.employer, NO_EMPLOYER) for p in people]
+    rec['marital'] = [MARITAL_CODE.get(p.marital_status, -1) for p in people]; rec['skill_level'] = [SKILL_CODE.get(p.skill_level, -1) for p in people]
+    rec['household_id'] = [p.household_id for p in people]
+    rec['annual_income'] = [p.annual_income for p in people]; rec['gov_support_cum'] = [p.gov_support_cum for p in people]
+    rec['cars'] = [len(p.cars) for p in people]; rec['use_bus'] = [p.use_bus for p in people]
+    rec['accident_involvement'] = [p.accident_involvement for p in people]; rec['layoff_status'] = [p.layoff_status for p in people]
+    return rec
+
+class PanelWriter:
+    """Appends the changed person and household rows of every logged year (see the module comment)."""
+    def __init__(self, base_filename):
+        self.base_filename = base_filename; self.household_types = []
+        self.last = {kind: np.zeros(0, dtype=dtype) for kind, dtype in DTYPES.items()}
+        for kind in DTYPES: open(self.path(kind), 'wb').close()
+
+    def path(self, kind, suffix='.bin'):
+        return f"{self.base_filename}_panel_{kind}{suffix}"
+
+    def _household_records(self, year):
+        households = [hh for hh in g.HOUSEHOLDS.values() if hh['members']]; rec = np.zeros(len(households), dtype=HOUSEHOLD_DTYPE)
+        for hh_type in {hh.get('type') for hh in households} - set(self.household_types): self.household_types.append(hh_type)
+        type_code = {hh_type: i for i, hh_type in enumerate(self.household_types)}
+        rec['year'] = year; rec['alive'] = True; rec['id'] = [hh['id'] for hh in households]
+        rec['type'] = [type_code[hh.get('type')] for hh in households]; rec['members'] = [len(hh['members']) for hh in households]
+        for attr in ('adults', 'children', 'employed', 'students', 'cars'): rec[attr] = [getattr(hh, attr) for hh in households]
+        for key in ('births', 'deaths', 'total_income', 'required_cost', 'savings_balance', 'loan_balance', 'taxes_cum'):
+            rec[key] = [hh.get(key, 0) for hh in households]
+        return rec
+
+    def record(self, year):
+        for kind, rec in (('persons', _person_records(year)), ('households', self._household_records(year))):
+            self._append(kind, rec, year)
+        self._write_metadata()
+
+    def _append(self, kind, rec, year):
+        """Writes the rows of ``rec`` that differ from each id's previous state, plus alive=False rows for ids that left."""
+        rec = rec[np.argsort(rec['id'], kind='stable')]; last = self.last[kind]
+        pos = np.minimum(np.searchsorted(last['id'], rec['id']), max(len(last) - 1, 0))
+        changed = np.ones(len(rec), dtype=bool)
+        if len(last):
+            known = last['id'][pos] == rec['id']; prev = last[pos]
+            same = known.copy()
+            for name in rec.dtype.names[2:]: same &= prev[name] == rec[name]
+            changed = ~same
+        gone = last[~np.isin(last['id'], rec['id'])].copy(); gone['year'] = year; gone['alive'] = False
+        with open(self.path(kind), 'ab') as f:
+            f.write(np.concatenate([rec[changed], gone]).tobytes())
+        self.last[kind] = rec
+
+    def _write_metadata(self):
+        meta = {'person_categories': PERSON_CATEGORIES, 'household_types': self.household_types,
+                'dtypes': {kind: dtype.descr for kind, dtype in DTYPES.items()}}
+        with open(f"{self.base_filename}_panel.json", 'w') as f: json.dump(meta, f)
+
+    def close(self):
+        for kind in DTYPES: build_panel_index(self.base_filename, kind)
+
+def open_panel(base_filename, kind='persons'):
+    """Memory-maps all panel records of ``kind`` ('persons' or 'households'), ordered by year."""
+    path = f"{base_filename}_panel_{kind}.bin"
+    if os.path.getsize(path) == 0: return np.zeros(0, dtype=DTYPES[kind])
+    return np.memmap(path, dtype=DTYPES[kind], mode='r')
+
+def build_panel_index(base_filename, kind='persons'):
+    """Writes the id index (rows of each id in year order) next to the records; rebuilt on demand if missing."""
+    records = open_panel(base_filename, kind); ids = np.asarray(records['id'])
+    order = np.argsort(ids, kind='stable'); unique_ids, starts = np.unique(ids[order], return_index=True)
+    np.savez(f"{base_filename}_panel_{kind}_index.npz", ids=unique_ids, starts=starts, order=order)
+
+def trajectory(base_filename, entity_id, kind='persons'):
+    """Every stored record of one person or household (only the years in which it changed)."""
+    index_path = f"{base_filename}_panel_{kind}_index.npz"
+    if not os.path.exists(index_path): build_panel_index(base_filename, kind)
+    with np.load(index_path) as index:
+        i = np.searchsorted(index['ids'], entity_id)
+        if i == len(index['ids']) or index['ids'][i] != entity_id: return np.zeros(0, dtype=DTYPES[kind])
+        end = index['starts'][i + 1] if i + 1 < len(index['starts']) else len(index['order'])
+        rows = index['order'][index['starts'][i]:end]
+    return np.array(open_panel(base_filename, kind)[rows])
+
+def panel_year(base_filename, year, kind='persons'):
+    """Reconstructs the full state of everyone alive at ``year`` (latest record of each id up to that year)."""
+    records = open_panel(base_filename, kind)
+    upto = np.array(records[:np.searchsorted(records['year'], year, side='right')])[::-1]
+    _, first = np.unique(upto['id'], return_index=True); state = upto[first]
+    return state[state['alive']]
@@ -0,0 +1,67 @@
+# mastercode02_profile.py
+import cProfile, math, time, tracemalloc
+import pandas as pd
+
+# --- Opt-in per-year, per-component instrumentation (run_simulation(..., profiler=Profiler())) ---
+# Agents touched by the step being run, while a Profiler is running.
+_TOUCHED = None
+
+def touched(n):
+    """Managers report how many agents (persons or households) the current step processed; a no-op when not profiling."""
+    if _TOUCHED is not None: _TOUCHED[0] += n
+
+class Profiler:
+    """Runs the event loop one salabim step at a time and books each step to (year, component class).
+
+    Per year and class it records wall time, salabim events processed, distinct components that ran, agents
+    touched (as reported by each component through touched(): a Person step touches its own agent) and, with
+    ``trace_memory``, the net bytes allocated via tracemalloc.
+    Events in (t-1, t] count for year t, the year they are logged under. ``years=(first, last)`` also runs
+    cProfile over that range; the stats are dumped to '<base>_profile.prof' (pstats format, e.g. for snakeviz).
+    Without a Profiler the runner keeps calling env.run(), so there is no cost when it is off.
+    """
+    def __init__(self, years=None, trace_memory=False):
+        self.years = years; self.trace_memory = trace_memory
+        self.stats = {}; self.cprofile = None
+
+    def run(self, env, till):
+        global _TOUCHED
+        perf = time.perf_counter; stats = self.stats; seen = set(); current_year = None; _TOUCHED = counter = [0]
+        profile = cProfile.Profile() if self.years else None; profiling = False
+        if self.trace_memory: tracemalloc.start()
+        try:
+            while env.peek() <= till:
+                year = math.ceil(env.peek())
+                if year != current_year:
+                    current_year = year; seen.clear()
+                    if profile is not None:
+                        wanted = self.years[0] <= year <= self.years[1]
+                        if wanted != profiling: profile.enable() if wanted else profile.disable(); profiling = wanted
+                memory = tracemalloc.get_traced_memory()[0] if self.trace_memory else 0
+                counter[0] = 0
+                start = perf(); env.step(); elapsed = perf() - start
+                component = env.current_component(); key = (year, type(component).__name__)
+                row = stats.get(key)
+                if row is None: row = stats[key] = [0.0, 0, 0, 0, 0]
+                row[0] += elapsed; row[1] += 1
+                if (key, id(component)) not in seen: seen.add((key, id(component))); row[2] += 1
+                row[4] += counter[0]
+                if self.trace_memory: row[3] += tracemalloc.get_traced_memory()[0] - memory
+        finally:
+            if profiling: profile.disable()
+            if self.trace_memory: tracemalloc.stop()
+            _TOUCHED = None
+        if profile is not None: self.cprofile = profile
+        env.run(till=till)
+
+    def table(self):
+        """One row per (year, component class), slowest classes first within each year."""
+        rows = [{'year': year, 'component': name, 'wall_s': wall, 'events': events, 'components': components,
+                 'agents': agents, 'alloc_bytes': alloc if self.trace_memory else None}
+                for (year, name), (wall, events, components, alloc, agents) in self.stats.items()]
+        df = pd.DataFrame(rows, columns=['year', 'component', 'wall_s', 'events', 'components', 'agents', 'alloc_bytes'])
+        return df.sort_values(['year', 'wall_s'], ascending=[True, False], ignore_index=True)
+
+    def write(self, base_filename):
+        self.table().to_csv(f"{base_filename}_profile.csv", index=False, float_format='%.6f')
+        if self.cprofile is not None: self.cprofile.dump_stats(f"{base_filename}_profile.prof")
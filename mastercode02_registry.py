@@ -0,0 +1,43 @@
+# mastercode02_registry.py
+
+class Registry:
+    """Ordered collection of persons keyed by ``person.id`` with O(1) append, remove and membership.
+
+    Drop-in for the plain lists previously used for g.POPULATION and household 'members':
+    iteration follows insertion order (a Python dict), so runs stay deterministic for a seed.
+    """
+    __slots__ = ('_items',)
+
+    def __init__(self, people=()):
+        self._items = {p.id: p for p in people}
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items.values())
+
+    def __contains__(self, person):
+        return self._items.get(person.id) is person
+
+    def __repr__(self):
+        return f"Registry({len(self._items)} people)"
+
+    def append(self, person):
+        self._items[person.id] = person
+
+    def extend(self, people):
+        for p in people: self._items[p.id] = p
+
+    def remove(self, person):
+        if self._items.get(person.id) is not person: raise ValueError(f"Person {person.id} not in registry")
+        del self._items[person.id]
+
+    def discard(self, person):
+        if self._items.get(person.id) is person: del self._items[person.id]
+
+    def get(self, person_id, default=None):
+        return self._items.get(person_id, default)
+
+    def clear(self):
+        self._items.clear()
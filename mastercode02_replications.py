@@ -0,0 +1,101 @@
+# mastercode02_replications.py
+import multiprocessing, os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+# Per-year tables returned by every replication (the per-person/household datasheets stay in the worker).
+REPLICATION_TABLES = ['annual_summary', 'scores_summary', 'rates_summary']
+YEAR_COLUMNS = {'annual_summary': 'Year', 'scores_summary': 'year', 'rates_summary': 'year'}
+
+def run_replication(seed, events, run_kwargs):
+    """Pool task: one quiet run_simulation, returning (seed, {table: DataFrame}) for REPLICATION_TABLES."""
+    from mastercode02_runner import run_simulation
+    log_data = run_simulation(events, seed=seed, quiet=True, **run_kwargs)
+    return seed, {name: pd.DataFrame(log_data[name]) for name in REPLICATION_TABLES}
+
+def process_pool(processes, tasks):
+    """Spawn-context pool with one task per child, so every run starts from fresh module state."""
+    processes = processes or os.cpu_count() or 1
+    return ProcessPoolExecutor(max_workers=max(1, min(processes, tasks)), mp_context=multiprocessing.get_context('spawn'), max_tasks_per_child=1)
+
+def run_replications(events=(), seeds=range(100), processes=None, macro_paths=None, **run_kwargs):
+    """Runs one replication per seed across a process pool and returns {seed: {table: DataFrame}}.
+
+    Every replication runs in a freshly spawned worker process (one task per child), so the
+    module-level state in mastercode02_globals and LOG_DATA is never shared between seeds.
+    Extra keyword arguments are passed on to run_simulation (duration, multiplier, engine).
+    ``macro_paths`` (from mastercode02_forecasts.sample_macro_paths) gives the i-th seed row i as its macro_path.
+    """
+    seeds = [int(seed) for seed in seeds]; events = list(events)
+    if macro_paths is not None and len(macro_paths) < len(seeds): raise ValueError(f"{len(macro_paths)} macro paths for {len(seeds)} seeds")
+    kwargs = [run_kwargs if macro_paths is None else {**run_kwargs, 'macro_path': macro_paths[i]} for i in range(len(seeds))]
+    results = {}
+    with process_pool(processes, len(seeds)) as pool:
+        for seed, tables in pool.map(run_replication, seeds, [events] * len(seeds), kwargs):
+            results[seed] = tables
+            print(f"Replications: seed {seed} done ({len(results)}/{len(seeds)})")
+    return results
+
+def summarize_replications(results, table='annual_summary', confidence=0.95):
+    """Merges one per-year table across replications into mean and confidence-interval columns.
+
+    Returns a tidy DataFrame with one row per (year, metric): mean, std, n, ci_low, ci_high.
+    """
+    year_col = YEAR_COLUMNS[table]
+    frames = [tables[table].assign(seed=seed) for seed, tables in results.items() if not tables[table].empty]
+    if not frames: return pd.DataFrame(columns=[year_col, 'metric', 'mean', 'std', 'n', 'ci_low', 'ci_high'])
+    long = pd.concat(frames, ignore_index=True).drop(columns='seed').melt(id_vars=year_col, var_name='metric')
+    long['value'] = pd.to_numeric(long['value'], errors='coerce')
+    summary = long.dropna(subset=['value']).groupby([year_col, 'metric'])['value'].agg(['mean', 'std', 'count']).reset_index().rename(columns={'count': 'n'})
+    t_crit = stats.t.ppf(0.5 + confidence / 2, np.maximum(summary['n'] - 1, 1))
+    half_width = np.where(summary['n'] > 1, t_crit * summary['std'] / np.sqrt(summary['n']), np.nan)
+    summary['ci_low'] = summary['mean'] - half_width; summary['ci_high'] = summary['mean'] + half_width
+    return summary
+
+# --- Adaptive replication count ---
+# Final-year outputs the controller watches by default: (table, column).
+ADAPTIVE_METRICS = [('annual_summary', 'Population'), ('scores_summary', 'economic_index'), ('scores_summary', 'transport_index')]
+
+def final_values(results, table, metric):
+    """One value per replication: ``metric`` in the last year of ``table``."""
+    year_col = YEAR_COLUMNS[table]; values = []
+    for tables in results.values():
+        df = tables[table]
+        if df.empty or metric not in df: continue
+        values.append(float(pd.to_numeric(df.sort_values(year_col)[metric], errors='coerce').iloc[-1]))
+    return np.array(values, dtype=float)
+
+def convergence_report(results, metrics=ADAPTIVE_METRICS, confidence=0.95, rel_precision=0.01):
+    """Mean, CI half-width and relative precision (half-width / |mean|) of each final-year metric."""
+    rows = []
+    for table, metric in metrics:
+        values = final_values(results, table, metric); values = values[np.isfinite(values)]; n = len(values)
+        mean = values.mean() if n else np.nan
+        half_width = stats.t.ppf(0.5 + confidence / 2, n - 1) * values.std(ddof=1) / np.sqrt(n) if n > 1 else np.inf
+        relative = half_width / abs(mean) if n and mean != 0 else (0.0 if half_width == 0 else np.inf)
+        rows.append({'table': table, 'metric': metric, 'n': n, 'mean': mean, 'half_width': half_width,
+                     'rel_precision': relative, 'converged': bool(relative <= rel_precision)})
+    return pd.DataFrame(rows)
+
+def run_adaptive_replications(events=(), metrics=ADAPTIVE_METRICS, rel_precision=0.01, confidence=0.95, batch_size=None,
+                              min_replications=4, max_replications=100, first_seed=0, processes=None, macro_paths=None, **run_kwargs):
+    """Runs replications in parallel batches until every metric's CI is within ``rel_precision`` of its mean.
+
+    After each batch (``batch_size`` seeds, default one per worker) the final-year ``metrics`` are checked with
+    convergence_report; the loop stops once all have converged (and ``min_replications`` have run) or once
+    ``max_replications`` is spent. Seeds are consecutive from ``first_seed``, so a rerun with a larger budget
+    repeats and extends the same runs. With ``macro_paths``, seed first_seed + i runs on row i (and the budget is
+    capped at the number of rows). Returns ({seed: {table: DataFrame}}, final convergence report).
+    """
+    batch_size = batch_size or processes or os.cpu_count() or 1
+    if macro_paths is not None: max_replications = min(max_replications, len(macro_paths))
+    results = {}; seed = first_seed
+    while True:
+        n = min(max(batch_size, min_replications - len(results)), max_replications - len(results))
+        paths = None if macro_paths is None else macro_paths[seed - first_seed:seed - first_seed + n]
+        results.update(run_replications(events, range(seed, seed + n), processes, paths, **run_kwargs)); seed += n
+        report = convergence_report(results, metrics, confidence, rel_precision)
+        print(f"Adaptive replications: {len(results)} runs, worst relative precision {report['rel_precision'].max():.4f} (target {rel_precision})")
+        if (report['converged'].all() and len(results) >= min_replications) or len(results) >= max_replications: return results, report
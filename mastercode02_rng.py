@@ -0,0 +1,77 @@
+# mastercode02_rng.py
+import random, zlib
+import numpy as np
+
+# --- Per-subsystem random streams for common random numbers (build_simulation(..., crn=True)) ---
+# Off by default: stream(name) is then the global `random` module and np_stream(name) is np.random, so runs are
+# drawn exactly as before. configure(seed) gives every subsystem its own random.Random and np.random.Generator,
+# keyed by the subsystem name, so a scenario change in one subsystem no longer shifts the draws of the others.
+# Deaths and births additionally use counter-based uniforms keyed by (agent id, year): the same person faces the
+# same draw in every scenario, which is what makes paired scenario comparisons low-variance.
+SUBSYSTEMS = ('setup', 'mortality', 'fertility', 'education', 'labour', 'cars', 'commute', 'transit',
+              'accidents', 'marriage', 'immigration', 'world', 'economy')
+_SEED = None; _STREAMS = {}; _NP_STREAMS = {}; _KEYS = {}
+_MASK = (1 << 64) - 1
+
+def _seed_sequence(seed, name):
+    return np.random.SeedSequence(seed, spawn_key=(zlib.crc32(name.encode()),))
+
+def configure(seed=None):
+    """Seeds one stream per subsystem from ``seed``, or switches the streams off again (seed=None)."""
+    global _SEED
+    _SEED = seed; _STREAMS.clear(); _NP_STREAMS.clear(); _KEYS.clear()
+    if seed is None: return
+    for name in SUBSYSTEMS:
+        state = _seed_sequence(seed, name).generate_state(3, np.uint64)
+        _STREAMS[name] = random.Random(int(state[0])); _NP_STREAMS[name] = np.random.Generator(np.random.PCG64(int(state[1])))
+        _KEYS[name] = int(state[2])
+
+def enabled():
+    return _SEED is not None
+
+def stream(name):
+    """random.Random-compatible source for scalar draws of one subsystem."""
+    return _STREAMS.get(name, random)
+
+def np_stream(name):
+    """NumPy source for array draws of one subsystem (np.random, or a Generator when streams are on)."""
+    return _NP_STREAMS.get(name, np.random)
+
+def _mix(x):
+    # splitmix64 finaliser
+    x = (x + 0x9E3779B97F4A7C15) & _MASK
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK
+    return x ^ (x >> 31)
+
+def agent_uniform(name, agent_id, counter):
+    """U[0, 1) that depends only on (stream, agent id, counter); a plain random.random() when streams are off."""
+    key = _KEYS.get(name)
+    if key is None: return random.random()
+    return (_mix(key ^ _mix(agent_id ^ _mix(counter))) >> 11) * (1.0 / (1 << 53))
+
+def _mix_array(x):
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+def agent_uniforms(name, agent_ids, counter, fallback):
+    """Vectorized agent_uniform; ``fallback`` (np.random or a Generator) draws them when streams are off."""
+    key = _KEYS.get(name)
+    if key is None: return fallback.random(len(agent_ids))
+    ids = np.asarray(agent_ids).astype(np.uint64)
+    counter = np.uint64(_mix(int(counter)))
+    return (_mix_array(np.uint64(key) ^ _mix_array(ids ^ counter)) >> np.uint64(11)) * (1.0 / (1 << 53))
+
+def get_state():
+    """Picklable stream states for checkpoints (None when streams are off)."""
+    if _SEED is None: return None
+    return {'seed': _SEED, 'python': {name: r.getstate() for name, r in _STREAMS.items()},
+            'numpy': {name: r.bit_generator.state for name, r in _NP_STREAMS.items()}}
+
+def set_state(state):
+    configure(None if state is None else state['seed'])
+    if state is None: return
+    for name, s in state['python'].items(): _STREAMS[name].setstate(s)
+    for name, s in state['numpy'].items(): _NP_STREAMS[name].bit_generator.state = s
@@ -0,0 +1,170 @@
+# mastercode02_runner.py
+import salabim as sim
+import pandas as pd
+import numpy as np
+from copy import deepcopy
+import contextlib, os, time, traceback
+
+from mastercode02_config_and_rates import RATES as BASE_RATES, SIMULATION_DURATION
+from mastercode02_agents import (MarriageManager, WorldManager, EconomicManager,
+                                 PublicTransitManager, TrafficManager, EducationManager,
+                                 GovernmentManager, CommuteManager, ScenarioManager,
+                                 HouseholdFinanceManager, ImmigrationManager)
+from mastercode02_setup import Initializer, CohortInitializer
+from mastercode02_snapshot import PopulationSweep
+from mastercode02_hazards import HazardManager
+from mastercode02_logging import LOG_DATA, log_yearly_data, reset_log_data, open_log_sink, open_panel_writer, write_and_close_csv_logs
+import mastercode02_globals as g
+import mastercode02_rng
+from mastercode02_profile import touched
+
+sim.yieldless(False)
+
+def get_trigger_events():
+    """Prompts the user to define the active trigger events for the simulation."""
+    events = []
+    print("--- Configure Trigger Events ---")
+
+    def get_input(prompt, type_func=int):
+        while True:
+            try:
+                return type_func(input(prompt))
+            except ValueError:
+                print("Invalid input. Please enter a valid number.")
+
+    for event_type, question, level_prompt in [
+        ('political_stability', "Activate Political Stability scenario? (yes/no): ", "  Enter Level (1-5): "),
+        ('panic', "\nActivate Panic (Disaster/Pandemic) scenario? (yes/no): ", "  Enter Level (1-5): "),
+        ('public_health', "\nActivate Public Health scenario? (yes/no): ", "  Enter Level (-5 for crisis to 5 for boom): "),
+    ]:
+        if input(question).lower() == 'yes':
+            print(f"\nConfiguring {event_type}...")
+            start = get_input("  Enter Start Year: ")
+            end = get_input("  Enter End Year: ")
+            level = get_input(level_prompt)
+            events.append({'type': event_type, 'enabled': True, 'start_year': start, 'end_year': end, 'level': level})
+
+    print("\n--- Trigger Event configuration complete. ---")
+    return events
+
+def scenario_name(events):
+    event_names = "_".join([evt['type'][:4] + str(evt['level']) for evt in events if evt['enabled']])
+    return event_names or "baseline"
+
+class YearlyReporter(sim.Component):
+    def setup(self, file_path=None, final_year=SIMULATION_DURATION, last_year_pop=None):
+        self.file_path = file_path
+        self.final_year = final_year
+        self.resumed = last_year_pop is not None
+        self.last_year_pop = last_year_pop or 0
+
+    def process(self):
+        if not self.resumed:
+            yield self.hold(0)
+            self.last_year_pop = len(g.POPULATION)
+            print("YearlyReporter: Logging initial state at Year 0...")
+            touched(self.last_year_pop + len(g.HOUSEHOLDS)); log_yearly_data(0, self.env, 0.0, self.final_year)
+        while True:
+            yield self.hold(1)
+            year = int(self.env.now())
+            current_pop = len(g.POPULATION)
+            growth_rate = (current_pop - self.last_year_pop) / self.last_year_pop if self.last_year_pop > 0 else 0
+            self.last_year_pop = current_pop
+            print(f"YearlyReporter: Logging end-of-year data for Year {year}...")
+            touched(current_pop + len(g.HOUSEHOLDS)); log_yearly_data(year, self.env, growth_rate, self.final_year)
+
+def start_managers(env, base_filename=None, final_year=SIMULATION_DURATION, last_year_pop=None, hazards=False):
+    """Creates the STAGE 2 agent-engine managers and the YearlyReporter; returns them by class name.
+
+    Same-time components run in creation order: right after the Person processes, PopulationSweep clears the
+    job market, draws the commute purposes and takes the yearly snapshot before any other manager reads it.
+    ``hazards`` adds the HazardManager (next-event deaths and births, see build_simulation).
+    """
+    managers = [PopulationSweep(env=env), PublicTransitManager(env=env), MarriageManager(env, g.HOUSEHOLDS, g.POPULATION, g.MARRIAGES),
+                TrafficManager(env=env), CommuteManager(env=env), GovernmentManager(env=env),
+                HouseholdFinanceManager(env=env), EducationManager(env=env), ImmigrationManager(env=env),
+                YearlyReporter(env=env, file_path=base_filename, final_year=final_year, last_year_pop=last_year_pop)]
+    if hazards: managers.append(HazardManager(env=env))
+    return {type(m).__name__: m for m in managers}
+
+def build_simulation(events=(), seed=123, duration=SIMULATION_DURATION, multiplier=1.0, engine='agents', base_filename=None, hazards=False, log_format=None, panel=False, crn=False, macro_path=None, population_seed=None):
+    """Resets global state and builds a ready-to-run environment; returns (env, components by class name).
+
+    ``engine`` is 'agents' (one Person process per agent) or 'cohort' (the array engine). ``hazards`` switches the
+    agent engine from yearly death and birth draws to next-event sampling (mastercode02_hazards). With a
+    ``base_filename``, ``log_format`` ('auto', 'parquet', 'arrow' or 'csv') streams the logs to disk every
+    year (mastercode02_logsink) instead of writing CSVs from memory at the end. ``panel`` also records the yearly
+    person and household panel (mastercode02_panel; agent engine only). ``crn`` draws every subsystem from its
+    own stream seeded by ``seed`` (mastercode02_rng), so paired scenario runs share common random numbers.
+    ``macro_path`` (years x PATH_SERIES, one row of mastercode02_forecasts.sample_macro_paths) replaces the
+    yearly ARIMA draws of WorldManager and EconomicManager.
+    The base population is generated from ``population_seed`` (default ``seed``) and cached on disk under that
+    seed and ``multiplier``, so scenario variants of a seed reuse one table. Every new (population_seed, multiplier)
+    adds a table to .mastercode02_cache; fix ``population_seed`` to share one across replication seeds.
+    """
+    g.reset(); reset_log_data(); g.HAZARD_SCHEDULING = hazards and engine != 'cohort'
+    mastercode02_rng.configure(seed if crn else None)
+    g.MACRO_PATH = None if macro_path is None else np.asarray(macro_path, dtype=float)
+    if base_filename and log_format: open_log_sink(base_filename, log_format)
+    if base_filename and panel and engine != 'cohort': open_panel_writer(base_filename)
+    env = sim.Environment(time_unit='years', random_seed=seed, trace=False)
+    g.RATES = deepcopy(BASE_RATES)
+    env.RATES = g.RATES
+
+    # STAGE 1
+    population_seed = seed if population_seed is None else population_seed
+    initializer = (CohortInitializer(env=env, seed=population_seed, multiplier=multiplier, log=True) if engine == 'cohort'
+                   else Initializer(env=env, seed=population_seed, multiplier=multiplier))
+    components = {type(c).__name__: c for c in [initializer, ScenarioManager(env=env, events=events), EconomicManager(env=env), WorldManager(env=env)]}
+    env.run(till=0)
+
+    # STAGE 2
+    if engine != 'cohort': components.update(start_managers(env, base_filename, duration, hazards=hazards))
+    return env, components
+
+def run_simulation(events=(), seed=123, duration=SIMULATION_DURATION, multiplier=1.0, engine='agents', base_filename=None, quiet=False, hazards=False, log_format=None, panel=False, profiler=None, crn=False, macro_path=None, population_seed=None):
+    """Runs one simulation from a clean global state and returns LOG_DATA.
+
+    CSV logs are only written when ``base_filename`` is given. ``quiet`` silences progress prints.
+    With ``log_format`` the logs are streamed instead, and LOG_DATA only keeps the per-year tables.
+    A mastercode02_profile.Profiler passed as ``profiler`` times every year and component class; its table
+    is written next to the logs as '<base_filename>_profile.csv'.
+    """
+    events = [dict(evt) for evt in events]
+    with contextlib.ExitStack() as stack:
+        if quiet: stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, 'w'))))
+        env = None
+        try:
+            env, _ = build_simulation(events, seed, duration, multiplier, engine, base_filename, hazards, log_format, panel, crn, macro_path, population_seed)
+            run_until(env, duration, events, profiler)
+        finally:
+            if base_filename and env is not None: write_and_close_csv_logs(base_filename, env)
+            if base_filename and profiler is not None: profiler.write(base_filename)
+    return LOG_DATA
+
+def run_until(env, duration, events=(), profiler=None):
+    # STAGE 3
+    print(f"\nStarting {duration}-year simulation with events: {scenario_name(events)}")
+    start_time = time.time()
+    if profiler is None: env.run(till=duration)
+    else: profiler.run(env, duration)
+    print(f"\nSimulation finished in {time.time() - start_time:.2f} seconds.")
+
+def run_simulation_scenario():
+    """Interactive entry point: asks for trigger events, runs once and writes the CSV logs."""
+    trigger_events = get_trigger_events()
+    base_filename = f'mastercode02_output_{scenario_name(trigger_events)}_{pd.Timestamp.now().strftime("%Y%m%d_%H%M")}'
+    run_simulation(trigger_events, base_filename=base_filename)
+    try:
+        summary_df = pd.read_csv(f"{base_filename}_annual_summary.csv")
+        print("\n--- Final Year Summary (from generated CSV) ---")
+        print(summary_df.iloc[-1].to_string())
+        print("---------------------------------------------")
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        print("\nCould not read summary CSV to print final results (file might be empty or not found).")
+    except Exception as e:
+        print(f"\nAn error occurred while printing final summary: {e}")
+        traceback.print_exc()
+
+if __name__ == '__main__':
+    run_simulation_scenario()
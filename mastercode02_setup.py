@@ -1,43 +1,64 @@
 # mastercode02_setup.py
-import salabim as sim, random
+import salabim as sim
+import numpy as np
 from mastercode02_config_and_rates import EMPLOYERS, EMPLOYER_PROBS, EDUCATION_CAPACITIES
 from mastercode02_agents import Person
+from mastercode02_cohort import CohortEngine, build_person_table
 import mastercode02_globals as g
-from mastercode02_generator import generate_initial_population, DATA
+from mastercode02_rng import stream
+from mastercode02_household import Household
+from mastercode02_capacity import CapacityPool
+from mastercode02_generator import generate_population_table, population_labels, assign_households, DATA
+
+def _create_households(multiplier=1.0):
+    for hh_type, count in DATA['households'].items():
+        for _ in range(int(round(count * multiplier))):
+            hh_id = g.next_household_id()
+            g.HOUSEHOLDS[hh_id] = Household(id=hh_id, type=hh_type)
+
+def create_capacity_pools():
+    for name, capacity in EDUCATION_CAPACITIES.items(): g.EDUCATION_RESOURCE[name] = CapacityPool(name, capacity)
+    for emp_id, emp_data in EMPLOYERS.items(): g.EMPLOYER_RESOURCE[emp_id] = CapacityPool(emp_data['name'], emp_data['capacity'])
 
 class Initializer(sim.Component):
-    def __init__(self, env):
-        super().__init__(env=env)
+    """Creates the Person processes and their households.
+
+    The base population comes from generate_population_table, cached by ``seed`` and ``multiplier``. Without a seed one
+    is drawn from the setup stream, so each run seed caches a table of its own (see build_simulation's population_seed).
+    """
+    def __init__(self, env, seed=None, multiplier=1.0):
+        super().__init__(env=env); self.seed = seed; self.multiplier = multiplier
 
     def process(self):
         print("\n--- RUNNING MASTERCODE02 INITIALIZER ---\n")
 
-        g.POPULATION.clear(); g.HOUSEHOLDS.clear()
-        generated_agents_data = generate_initial_population()
-        for agent_data in generated_agents_data:
-            initial_data = {'id': g.next_person_id(),'age': agent_data.age,'sex': agent_data.sex,'education': agent_data.education,'employment': agent_data.employment,'household_id': None,'marital_status': agent_data.marital_status}
+        g.POPULATION.clear(); g.HOUSEHOLDS.clear(); g.MARRIAGE_MARKET.clear()
+        seed = stream('setup').getrandbits(32) if self.seed is None else self.seed
+        population = generate_population_table(seed=seed, multiplier=self.multiplier)
+        columns = zip(population['age'].tolist(), *(population_labels(population, c) for c in ['sex', 'education', 'employment', 'marital_status']))
+        for age, sex, education, employment, marital_status in columns:
+            initial_data = {'id': g.next_person_id(),'age': age,'sex': sex,'education': education,'employment': employment,'household_id': None,'marital_status': marital_status}
             Person(self.env, initial_data, g.POPULATION)
 
-        for hh_type, count in DATA['households'].items():
-            for _ in range(count):
-                hh_id = g.next_household_id()
-                g.HOUSEHOLDS[hh_id] = {'id': hh_id, 'type': hh_type, 'members': []}
+        _create_households(self.multiplier)
 
-        unplaced_agents = list(g.POPULATION)
-        random.shuffle(unplaced_agents)
-        for person in unplaced_agents:
-            target_hh_id = random.choice(list(g.HOUSEHOLDS.keys()))
+        people = list(g.POPULATION); hh_ids = list(g.HOUSEHOLDS.keys())
+        rng = np.random.default_rng(stream('setup').getrandbits(64))
+        placement = assign_households([p.age for p in people], [p.sex == 'Male' for p in people],
+                                      [p.marital_status == 'Now married (except separated)' for p in people],
+                                      [g.HOUSEHOLDS[hh_id]['type'] for hh_id in hh_ids], rng)
+        for person, hh_idx in zip(people, placement.tolist()):
+            target_hh_id = hh_ids[hh_idx]
             person.household_id = target_hh_id
-            g.HOUSEHOLDS[target_hh_id]['members'].append(person)
+            g.HOUSEHOLDS[target_hh_id].add_member(person)
 
-        for name, capacity in EDUCATION_CAPACITIES.items(): g.EDUCATION_RESOURCE[name] = sim.Resource(name, capacity=capacity, env=self.env)
-        for emp_id, emp_data in EMPLOYERS.items(): g.EMPLOYER_RESOURCE[emp_id] = sim.Resource(emp_data['name'], capacity=emp_data['capacity'], env=self.env)
+        create_capacity_pools()
 
         print("Initializer: Pre-assigning initial employers and income...")
         employer_ids = list(EMPLOYERS.keys())
         for person in g.POPULATION:
             if person.employment_status == 'Employed':
-                chosen_employer_id = random.choices(employer_ids, weights=EMPLOYER_PROBS, k=1)[0]
+                chosen_employer_id = stream('setup').choices(employer_ids, weights=EMPLOYER_PROBS, k=1)[0]
                 person.employer = chosen_employer_id
                 person._assign_skill_and_income()
 
@@ -47,4 +68,22 @@ class Initializer(sim.Component):
             person.activate()
 
         print(f"\nSUCCESS: Initialized and activated {len(g.POPULATION)} people in {len(g.HOUSEHOLDS)} households.")
-        yield self.hold(0)
\ No newline at end of file
+        yield self.hold(0)
+
+class CohortInitializer(sim.Component):
+    """Array-engine counterpart of Initializer: builds a PersonTable and starts one CohortEngine instead of a Person process per agent."""
+    def __init__(self, env, seed=None, multiplier=1.0, log=True):
+        super().__init__(env=env); self.seed = seed; self.multiplier = multiplier; self.log = log; self.engine = None
+
+    def process(self):
+        print("\n--- RUNNING MASTERCODE02 COHORT INITIALIZER ---\n")
+
+        g.POPULATION.clear(); g.HOUSEHOLDS.clear(); g.MARRIAGE_MARKET.clear()
+        _create_households(self.multiplier); create_capacity_pools()
+        seed = stream('setup').getrandbits(32) if self.seed is None else self.seed
+        rng = np.random.default_rng(stream('setup').getrandbits(64))
+        table = build_person_table(generate_population_table(seed=seed, multiplier=self.multiplier), g.HOUSEHOLDS, rng)
+        self.engine = CohortEngine(env=self.env, table=table, seed=rng.integers(2**63), log=self.log)
+
+        print(f"\nSUCCESS: Initialized {len(table)} people as array columns in {len(g.HOUSEHOLDS)} households.")
+        yield self.hold(0)
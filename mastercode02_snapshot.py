@@ -0,0 +1,94 @@
+# mastercode02_snapshot.py
+import salabim as sim
+import numpy as np
+from mastercode02_config_and_rates import COMMUTATION_PURPOSE_RATES, COMMUTATION_PURPOSES
+import mastercode02_globals as g
+from mastercode02_rng import np_stream
+from mastercode02_labour import clear_labour_market, JOB_SEEKING_STATUSES
+from mastercode02_profile import touched
+
+BUS_PURPOSES = ('Work', 'School')
+NOT_IN_LABOR_FORCE = ('Too Young', 'Retired', 'student')
+
+# --- Commute purposes: COMMUTATION_PURPOSE_RATES bands ('0-4', '5-17', '18-24', '25-54', '55-64', '65+') by upper age ---
+TRIP_BAND_MAX_AGES = np.array([4, 17, 24, 54, 64])
+TRIP_PURPOSE_RATES = np.array([COMMUTATION_PURPOSE_RATES[band] for band in ['0-4', '5-17', '18-24', '25-54', '55-64', '65+']])
+TRIP_PURPOSE_CUM = np.cumsum(TRIP_PURPOSE_RATES, axis=1)
+# Last purpose each band can draw: a draw that rounds up to the band total is clamped here (trailing rates may be 0).
+TRIP_PURPOSE_LAST = np.array([np.flatnonzero(rates > 0)[-1] for rates in TRIP_PURPOSE_RATES])
+
+def sample_trip_purposes(ages, rng):
+    """Draws one purpose index (into COMMUTATION_PURPOSES) per age, weighted by the age's band."""
+    band = np.searchsorted(TRIP_BAND_MAX_AGES, ages); cum = TRIP_PURPOSE_CUM[band]
+    return np.minimum((cum <= (rng.random(len(cum)) * cum[:, -1])[:, None]).sum(axis=1), TRIP_PURPOSE_LAST[band])
+
+def count_trips(purposes):
+    for k, count in enumerate(np.bincount(purposes, minlength=len(COMMUTATION_PURPOSES)).tolist()):
+        if count: g.TRIP_SUMMARY[COMMUTATION_PURPOSES[k]] = g.TRIP_SUMMARY.get(COMMUTATION_PURPOSES[k], 0) + count
+
+class PopulationSnapshot:
+    """Per-year aggregates of g.POPULATION gathered in a single pass and shared by the managers and the logs.
+
+    Lists hold the persons themselves (in population order), so managers keep their random draws in the
+    same order as a direct scan. Persons added later in the year (immigrants) are folded in with add().
+    """
+    def __init__(self, year, people=()):
+        self.year = year
+        self.bus_candidates = []; self.bus_users = []; self.car_owners = []; self.accident_involved = []
+        self.students = []; self.by_education = {}; self.eligible_males = []; self.incomes = []
+        self.total_cars = 0; self.active_cars = 0; self.employed = 0; self.labor_force = 0
+        self.high_risk_drivers = 0; self.old_vehicles = 0
+        for p in people: self.add(p)
+
+    def add(self, p):
+        cars = p.cars; active = not p.ispassive()
+        if cars:
+            n_cars = len(cars); self.car_owners.append(p); self.total_cars += n_cars
+            if active: self.active_cars += n_cars
+            if 16 <= p.age <= 21: self.high_risk_drivers += 1
+            ages = g.VEHICLES.age; self.old_vehicles += sum(1 for car in cars if ages[car] >= 8)
+        elif p.commute_purpose in BUS_PURPOSES: self.bus_candidates.append(p)
+        if p.use_bus: self.bus_users.append(p)
+        if p.accident_involvement: self.accident_involved.append(p)
+        if p.is_in_jc_school: self.students.append(p)
+        self.by_education.setdefault(p.education, []).append(p)
+        if active and p.sex == 'Male' and p.age >= 22 and p.marital_status == 'Never married': self.eligible_males.append(p)
+        if p.employment_status == 'Employed': self.employed += 1
+        if p.employment_status not in NOT_IN_LABOR_FORCE: self.labor_force += 1
+        if p.annual_income > 0: self.incomes.append(p.annual_income)
+
+def population_snapshot(env):
+    """Returns this year's snapshot, sweeping the population now if PopulationSweep hasn't run yet this year."""
+    year = int(env.now())
+    if g.ANNUAL_SNAPSHOT is None or g.ANNUAL_SNAPSHOT.year != year: g.ANNUAL_SNAPSHOT = PopulationSnapshot(year, g.POPULATION)
+    return g.ANNUAL_SNAPSHOT
+
+class PopulationSweep(sim.Component):
+    """Annual sweep stage: created before the other STAGE 2 managers, so each year it runs after the Person
+    processes and before any manager reads the snapshot.
+
+    Each year one pass gathers every age and the labour market's employed and job candidates. The market then
+    clears (mastercode02_labour.clear_labour_market) and this year's commute purposes are drawn in one batch for
+    everyone who stepped (newborns keep theirs until next year) and counted into g.TRIP_SUMMARY. A second pass
+    applies the purposes and builds the snapshot from the updated state.
+    """
+    def process(self):
+        g.ANNUAL_SNAPSHOT = PopulationSnapshot(int(self.env.now()), g.POPULATION)
+        while True:
+            yield self.hold(1)
+            ages = []; employed = []; candidates = []
+            for i, p in enumerate(g.POPULATION):
+                age = p.age; status = p.employment_status; ages.append(age)
+                if status == 'Employed': employed.append((i, p))
+                elif status in JOB_SEEKING_STATUSES and 18 <= age < 65: candidates.append((i, p))
+            touched(len(ages)); clear_labour_market(self.env, employed, candidates)
+            ages = np.array(ages, dtype=np.int64); stepped = ages > 0
+            purposes = sample_trip_purposes(ages[stepped], np_stream('commute')); count_trips(purposes)
+
+            snapshot = PopulationSnapshot(int(self.env.now())); purpose = iter(purposes.tolist())
+            for p, has_stepped in zip(g.POPULATION, stepped.tolist()):
+                if has_stepped:
+                    p.commute_purpose = COMMUTATION_PURPOSES[next(purpose)]
+                    if p.cars: p.use_bus = False
+                snapshot.add(p)
+            g.ANNUAL_SNAPSHOT = snapshot
@@ -0,0 +1,126 @@
+# mastercode02_sweep.py
+# Non-interactive batch mode for ScenarioManager: expands a declarative sweep (grid or Latin
+# hypercube over event type, start/end year and level), runs every (scenario, seed) across a
+# process pool and appends one tidy row per (scenario, seed, year) to a results CSV.
+#
+#     python mastercode02_sweep.py sweep.json --results sweep_results.csv --processes 8
+#
+# Example sweep.json:
+#     {"design": "lhs", "samples": 40, "seeds": [1, 2, 3],
+#      "run": {"duration": 50, "engine": "agents"},
+#      "events": [{"type": ["panic", "public_health"], "start_year": {"min": 5, "max": 30},
+#                  "end_year": {"min": 10, "max": 50}, "level": [1, 2, 3, 4, 5]}]}
+import argparse, itertools, json, os
+from concurrent.futures import as_completed
+import numpy as np
+import pandas as pd
+from mastercode02_cache import cache_key
+from mastercode02_replications import run_replication, process_pool
+
+EVENT_FACTORS = ['type', 'start_year', 'end_year', 'level']
+
+def _values(spec):
+    """A factor is a list of values, a single value, or an inclusive integer range {"min": a, "max": b}."""
+    if isinstance(spec, dict): return list(range(int(spec['min']), int(spec['max']) + 1))
+    return list(spec) if isinstance(spec, (list, tuple)) else [spec]
+
+def _event(values):
+    return {'type': values['type'], 'enabled': True, 'start_year': int(values['start_year']), 'end_year': int(values['end_year']), 'level': int(values['level'])}
+
+def expand_sweep(spec):
+    """Returns the list of scenarios (each a list of event dicts) described by a sweep spec.
+
+    Combinations with an event that would never be active (end_year <= start_year) are dropped, as are
+    repeated combinations; both counts are reported, since they leave an LHS design with fewer points.
+    """
+    groups = [{factor: _values(group[factor]) for factor in EVENT_FACTORS} for group in spec.get('events', [])]
+    dims = [(i, factor, values) for i, group in enumerate(groups) for factor, values in group.items()]
+    if not dims: return [[]]
+    if spec.get('design', 'grid') == 'grid':
+        combos = itertools.product(*(values for _, _, values in dims))
+    elif spec['design'] == 'lhs':
+        samples = int(spec['samples']); rng = np.random.default_rng(spec.get('design_seed', 0))
+        # One stratum per sample in every dimension, strata shuffled independently per dimension.
+        strata = np.stack([(rng.permutation(samples) + rng.random(samples)) / samples for _ in dims], axis=1)
+        combos = [[values[int(u * len(values))] for u, (_, _, values) in zip(row, dims)] for row in strata]
+    else:
+        raise ValueError(f"Unknown sweep design: {spec['design']!r} (expected 'grid' or 'lhs')")
+    scenarios, seen = [], set(); invalid = duplicates = 0
+    for combo in combos:
+        picked = [{} for _ in groups]
+        for (i, factor, _), value in zip(dims, combo): picked[i][factor] = value
+        events = [_event(values) for values in picked]
+        if any(event['end_year'] <= event['start_year'] for event in events): invalid += 1; continue
+        key = json.dumps(events, sort_keys=True)
+        if key in seen: duplicates += 1; continue
+        seen.add(key); scenarios.append(events)
+    if invalid or duplicates:
+        print(f"Sweep: dropped {invalid} combinations with end_year <= start_year and {duplicates} duplicates; {len(scenarios)} scenarios left.")
+    return scenarios
+
+def scenario_id(events, run_kwargs):
+    return cache_key('scenario', events, run_kwargs)
+
+def _results_header(results_path):
+    if not os.path.exists(results_path) or os.path.getsize(results_path) == 0: return None
+    return list(pd.read_csv(results_path, nrows=0).columns)
+
+def _completed_runs(results_path):
+    if _results_header(results_path) is None: return set()
+    return set(pd.read_csv(results_path, usecols=['run_key'])['run_key'])
+
+def _check_columns(columns, header, results_path):
+    missing = [c for c in columns if c not in header]
+    if missing: raise ValueError(f"{results_path} has no columns {missing}; write this sweep to a new results file")
+
+def _append_results(rows, results_path):
+    """Appends rows under the file's existing header (columns a run lacks stay empty); unknown columns are rejected."""
+    header = _results_header(results_path)
+    if header is None: rows.to_csv(results_path, index=False); return
+    _check_columns(rows.columns, header, results_path)
+    rows.reindex(columns=header).to_csv(results_path, mode='a', header=False, index=False)
+
+def _tidy(scenario, events, seed, run_key, tables):
+    annual = tables['annual_summary']
+    scores = tables['scores_summary'].rename(columns={'year': 'Year'})
+    rows = annual.merge(scores, on='Year', how='left') if not scores.empty else annual.copy()
+    meta = {'scenario_id': scenario, 'run_key': run_key, 'seed': seed}
+    for i, event in enumerate(events, start=1):
+        for factor in EVENT_FACTORS: meta[f"e{i}_{factor}"] = event[factor]
+    return pd.concat([pd.DataFrame([meta] * len(rows)), rows.reset_index(drop=True)], axis=1)
+
+def run_sweep(spec, results_path, processes=None):
+    """Runs every (scenario, seed) of the sweep not already in results_path; returns the number of runs executed."""
+    run_kwargs = dict(spec.get('run', {})); seeds = [int(s) for s in spec.get('seeds', [123])]
+    header = _results_header(results_path)
+    if header is not None: _check_columns([f"e{i}_{factor}" for i in range(1, len(spec.get('events', [])) + 1) for factor in EVENT_FACTORS], header, results_path)
+    done = _completed_runs(results_path); tasks = []
+    for events in expand_sweep(spec):
+        scenario = scenario_id(events, run_kwargs)
+        for seed in seeds:
+            run_key = cache_key('run', scenario, seed)
+            if run_key not in done: tasks.append((scenario, events, seed, run_key))
+    print(f"Sweep: {len(tasks)} runs to execute ({len(done)} already in {results_path}).")
+    if not tasks: return 0
+    with process_pool(processes, len(tasks)) as pool:
+        futures = {pool.submit(run_replication, seed, events, run_kwargs): (scenario, events, seed, run_key) for scenario, events, seed, run_key in tasks}
+        for n, future in enumerate(as_completed(futures), start=1):
+            scenario, events, seed, run_key = futures[future]
+            try: _, tables = future.result()
+            except Exception as e:
+                print(f"Sweep: run {run_key} (scenario {scenario}, seed {seed}) failed: {e}"); continue
+            _append_results(_tidy(scenario, events, seed, run_key, tables), results_path)
+            print(f"Sweep: {n}/{len(tasks)} runs done.")
+    return len(tasks)
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a batch scenario sweep without interactive prompts.')
+    parser.add_argument('spec', help='JSON sweep specification')
+    parser.add_argument('--results', default='sweep_results.csv', help='tidy results CSV; runs already present are skipped')
+    parser.add_argument('--processes', type=int, default=None)
+    args = parser.parse_args()
+    with open(args.spec) as f: spec = json.load(f)
+    run_sweep(spec, args.results, args.processes)
+
+if __name__ == '__main__':
+    main()
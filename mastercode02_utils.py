@@ -1,6 +1,15 @@
 # mastercode02_utils.py
+import numpy as np
 from mastercode02_config_and_rates import COST_GRID
 
+# --- Household cost lookup, summed over COST_GRID categories once ---
+# COST_TABLE[adults key, min(children, 3)]; households beyond 3 children / 2 adults add marginal costs.
+ADULTS_KEYS = ["1_adult", "2_adults_1_working", "2_adults_2_working"]
+COST_TABLE = np.array([[sum(COST_GRID[category][key][c] for category in COST_GRID) for c in range(4)] for key in ADULTS_KEYS])
+MARGINAL_CHILD_COST = COST_TABLE[:, 3] - COST_TABLE[:, 2]
+MARGINAL_ADULT_COST = int(COST_TABLE[2, 0] - COST_TABLE[0, 0])
+_COST_ROWS = COST_TABLE.tolist(); _MARGINAL_CHILD_ROWS = MARGINAL_CHILD_COST.tolist()
+
 def classify_household_for_cost(members):
     """Determines a household's composition for cost calculation."""
     adults = sum(1 for p in members if p.age >= 18)
@@ -19,26 +28,23 @@ def compute_household_cost(members, cpi_inflation_multiplier):
     if not members:
         return 0
 
-    adults, children, working_adults, adults_key = classify_household_for_cost(members)
-
-    # Base cost for the adults and up to 3 children
-    child_idx = min(children, 3)
-    total_cost = sum(COST_GRID[category][adults_key][child_idx] for category in COST_GRID)
-
-    # Add cost for extra children if any
-    if children > 3:
-        # Calculate the marginal cost of one extra child
-        cost_3_children = sum(COST_GRID[category][adults_key][3] for category in COST_GRID)
-        cost_2_children = sum(COST_GRID[category][adults_key][2] for category in COST_GRID)
-        marginal_child_cost = cost_3_children - cost_2_children
-        total_cost += (children - 3) * marginal_child_cost
-
-    # Add cost for extra adults if any
-    if adults > 2:
-        cost_2_adults = sum(COST_GRID[category]["2_adults_2_working"][0] for category in COST_GRID)
-        cost_1_adult = sum(COST_GRID[category]["1_adult"][0] for category in COST_GRID)
-        marginal_adult_cost = cost_2_adults - cost_1_adult
-        total_cost += (adults - 2) * marginal_adult_cost
-
-    # Apply the global CPI inflation multiplier
-    return total_cost * cpi_inflation_multiplier
\ No newline at end of file
+    adults, children, working_adults, _ = classify_household_for_cost(members)
+    return household_cost(adults, children, working_adults, cpi_inflation_multiplier)
+
+def household_cost(adults, children, working_adults, cpi_inflation_multiplier):
+    """Same as compute_household_cost, from member counts (e.g. a Household's running aggregates)."""
+    if adults + children == 0:
+        return 0
+    key = 0 if adults <= 1 else (2 if working_adults >= 2 else 1)
+    total_cost = _COST_ROWS[key][min(children, 3)]
+    if children > 3: total_cost += (children - 3) * _MARGINAL_CHILD_ROWS[key]
+    if adults > 2: total_cost += (adults - 2) * MARGINAL_ADULT_COST
+    return total_cost * cpi_inflation_multiplier
+
+def household_costs(adults, children, working_adults, cpi_inflation_multiplier):
+    """Vectorized household_cost over arrays of compositions; returns a float array."""
+    adults = np.asarray(adults); children = np.asarray(children); working_adults = np.asarray(working_adults)
+    key = np.where(adults <= 1, 0, np.where(working_adults >= 2, 2, 1))
+    total_cost = (COST_TABLE[key, np.minimum(children, 3)] + np.maximum(children - 3, 0) * MARGINAL_CHILD_COST[key]
+                  + np.maximum(adults - 2, 0) * MARGINAL_ADULT_COST)
+    return np.where(adults + children == 0, 0, total_cost * cpi_inflation_multiplier)
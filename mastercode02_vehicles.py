@@ -0,0 +1,62 @@
+# mastercode02_vehicles.py
+import numpy as np
+
+# --- Shared, array-backed vehicle table ---
+# Every car ever bought is one row of g.VEHICLES; its integer car id is the row (row 0 is unused, so ids start at 1
+# like the old 'CAR_1'). Persons only hold a tuple of their car ids. Vehicle events are stored as
+# (year, code, car_id, owner_id, other_id) tuples and turned into the text columns on export (vehicle_event_records).
+PURCHASE, INHERITANCE, RETIRED_AGE, RETIRED_NO_HEIR = range(4)
+EVENT_NAMES = ('Purchase', 'Inheritance', 'Retirement', 'Retirement')
+EVENT_DETAILS = ("Purchased by Person {0} in HH {1}", "Owner {0} died, car inherited by Person {1}",
+                 "Car retired due to age. Owner: {0}", "Owner {0} died, no heir in household.")
+NO_OWNER = -1
+
+def car_label(car_id):
+    return f"CAR_{car_id}"
+
+class VehicleTable:
+    """Age and owner of every car as growable NumPy columns (owner is NO_OWNER once the car is retired)."""
+    def __init__(self, capacity=1024):
+        self.age = np.zeros(capacity, dtype=np.int16); self.owner = np.full(capacity, NO_OWNER, dtype=np.int64); self.size = 1
+
+    def __len__(self):
+        return self.size - 1
+
+    def clear(self):
+        self.age[:] = 0; self.owner[:] = NO_OWNER; self.size = 1
+
+    def _reserve(self, size):
+        capacity = len(self.age)
+        while capacity < size: capacity *= 2
+        if capacity > len(self.age):
+            self.age = np.concatenate([self.age, np.zeros(capacity - len(self.age), dtype=np.int16)])
+            self.owner = np.concatenate([self.owner, np.full(capacity - len(self.owner), NO_OWNER, dtype=np.int64)])
+
+    def add(self, owner_id):
+        self._reserve(self.size + 1)
+        car_id = self.size; self.size += 1
+        self.age[car_id] = 0; self.owner[car_id] = owner_id
+        return car_id
+
+    def add_many(self, owner_ids):
+        """Adds one new car per owner id; returns their car ids."""
+        owner_ids = np.asarray(owner_ids, dtype=np.int64); self._reserve(self.size + len(owner_ids))
+        car_ids = np.arange(self.size, self.size + len(owner_ids)); self.size += len(owner_ids)
+        self.age[car_ids] = 0; self.owner[car_ids] = owner_ids
+        return car_ids
+
+    def get_state(self):
+        """Picklable copy of the used rows (for checkpoints)."""
+        return {'age': self.age[:self.size].copy(), 'owner': self.owner[:self.size].copy()}
+
+    def set_state(self, state):
+        self.age = state['age'].copy(); self.owner = state['owner'].copy(); self.size = len(self.age)
+
+    def in_use(self):
+        """Ids of the cars that haven't been retired."""
+        return np.flatnonzero(self.owner[:self.size] != NO_OWNER)
+
+def vehicle_event_records(events):
+    """Text rows (year, event, car_id, details) of stored vehicle event tuples, as written to the logs."""
+    return [{'year': year, 'event': EVENT_NAMES[code], 'car_id': car_label(car_id), 'details': EVENT_DETAILS[code].format(owner_id, other_id)}
+            for year, code, car_id, owner_id, other_id in events]